@@ -0,0 +1,69 @@
+"""
+Production server for the HumanChurnML API
+Run with: python api/serve.py --workers 4 --threads 2
+
+Uses gunicorn (pip install gunicorn, Linux/macOS). The app, engine,
+patterns and feature index are loaded once in the master process before
+the workers are forked, so workers share that memory copy-on-write. SIGTERM / Ctrl+C
+stops accepting connections and lets in-flight requests finish.
+"""
+
+import argparse
+import os
+import sys
+
+# Make the repo root importable however the script is started
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the HumanChurnML API with gunicorn")
+    parser.add_argument('--host', default=os.environ.get('CHURN_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('CHURN_PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('CHURN_WORKERS', os.cpu_count() or 1)),
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('CHURN_THREADS', 1)),
+                        help="threads per worker")
+    parser.add_argument('--timeout', type=int, default=120,
+                        help="seconds before a stuck worker is restarted")
+    parser.add_argument('--graceful-timeout', type=int, default=30,
+                        help="seconds in-flight requests get to finish on shutdown")
+    return parser.parse_args(argv)
+
+
+def serve(args):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise ImportError("Production serving requires gunicorn: pip install gunicorn")
+    
+    # Loaded here, in the master, before any worker is forked
+    from simple_api import app, feature_index
+    feature_index.current()
+    
+    class ChurnServer(BaseApplication):
+        """gunicorn application serving the preloaded Flask app"""
+        
+        def load_config(self):
+            options = {
+                'bind': f"{args.host}:{args.port}",
+                'workers': args.workers,
+                'threads': args.threads,
+                'timeout': args.timeout,
+                'graceful_timeout': args.graceful_timeout,
+                'preload_app': True
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+        
+        def load(self):
+            return app
+    
+    print(f"🚀 Serving HumanChurnML API on http://{args.host}:{args.port} "
+          f"({args.workers} workers x {args.threads} threads)")
+    ChurnServer().run()
+
+
+if __name__ == '__main__':
+    serve(parse_args())
@@ -3,17 +3,100 @@ Simple API for HumanChurnML
 Run with: python simple_api.py
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 import pandas as pd
+import io
+import os
 import sys
 sys.path.append('..')
 from src.production.churn_engine import ChurnEngine
+from src.production.feature_index import FeatureIndexLoader
+from src.production.jobs import JobQueue, QueueFull
+from src.production.result_cache import ResultCache
 import json
 
 app = Flask(__name__)
 
-# Initialize engine
-engine = ChurnEngine(company_name="API User", industry="unknown")
+# Request/response formats for /predict, picked by Content-Type and Accept
+RECORDS_JSON = 'application/json'
+COLUMNS_JSON = 'application/vnd.humanchurn.columns+json'
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+
+def _pyarrow():
+    """pyarrow is only needed for Arrow requests and responses"""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError("Arrow requests and responses require pyarrow: pip install pyarrow")
+    return pa
+
+def json_safe(summary):
+    """Summary with NaN (e.g. avg_risk of no customers) as null, json.dumps writes invalid NaN"""
+    return {key: None if isinstance(value, float) and value != value else value
+            for key, value in summary.items()}
+
+def read_predict_input():
+    """(customers, activities) DataFrames from the request body"""
+    if request.mimetype == ARROW_STREAM:
+        # Arrow body: the activities table, customers = everyone in it
+        pa = _pyarrow()
+        activities_df = pa.ipc.open_stream(request.get_data()).read_all().to_pandas()
+        customers_df = pd.DataFrame({'customer_id': activities_df['customer_id'].unique()})
+        return customers_df, activities_df
+    
+    # Records: lists of row objects, columns: one array per field
+    data = request.get_json(force=request.mimetype == COLUMNS_JSON)
+    return pd.DataFrame(data['customers']), pd.DataFrame(data['activities'])
+
+def predict_response(results, summary):
+    """Results in the format the client accepts (records JSON by default)"""
+    mimetype = request.accept_mimetypes.best_match(
+        [RECORDS_JSON, COLUMNS_JSON, ARROW_STREAM], default=RECORDS_JSON
+    )
+    
+    if mimetype == ARROW_STREAM:
+        # Summary travels in the schema metadata
+        pa = _pyarrow()
+        table = pa.Table.from_pandas(results, preserve_index=False)
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}), b'summary': json.dumps(summary).encode()
+        })
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(sink.getvalue().to_pybytes(), mimetype=ARROW_STREAM)
+    
+    if mimetype == COLUMNS_JSON:
+        output = results.to_dict(orient='list')
+    else:
+        output = results.to_dict(orient='records')
+    
+    response = jsonify({
+        "success": True,
+        "results": output,
+        "summary": summary
+    })
+    response.mimetype = mimetype
+    return response
+
+# Job workers are spawned and run this file again as __mp_main__ (under
+# python api/simple_api.py). They get their engine from the queue, so the
+# services are only built in the serving process, where the queue and the
+# feature index touch the disk on first use
+if __name__ != '__mp_main__':
+    # Initialize engine
+    engine = ChurnEngine(company_name="API User", industry="unknown", cache=ResultCache())
+    
+    # Background jobs for analyses too big to wait for in one request
+    jobs = JobQueue(
+        engine,
+        db_path=os.environ.get('CHURN_JOBS_DB', 'jobs/jobs.db'),
+        max_running=int(os.environ.get('CHURN_JOB_WORKERS', 2)),
+        max_pending=int(os.environ.get('CHURN_JOB_QUEUE', 20))
+    )
+    
+    # Per-customer features for /score, reloaded when the state file changes
+    feature_index = FeatureIndexLoader(engine, os.environ.get('CHURN_STATE', 'state/engagement.pkl'))
 
 @app.route('/', methods=['GET'])
 def home():
@@ -22,6 +105,12 @@ def home():
         "version": "1.0",
         "endpoints": {
             "/predict": "POST - Send customer data for predictions",
+            "/predict/stream": "POST - Stream NDJSON activities, get NDJSON predictions back",
+            "/jobs": "POST - Queue a large analysis (same input as /predict), get a job id",
+            "/jobs/<id>": "GET - Job status and progress",
+            "/jobs/<id>/results?page=1": "GET - One page of a finished job's results",
+            "/score/<customer_id>": "GET - Score one known customer from the in-memory index",
+            "/score": "POST - Score a list of known customers: {\"customer_ids\": [...]}",
             "/health": "GET - Check if API is running",
             "/stats": "GET - Get model statistics"
         }
@@ -36,7 +125,8 @@ def stats():
     return jsonify({
         "customers_analyzed": engine.patterns['universal']['total_customers_analyzed'],
         "industries": engine.patterns['universal']['industries_covered'],
-        "multiplier": engine.patterns['universal']['engagement_multiplier']
+        "multiplier": engine.patterns['universal']['engagement_multiplier'],
+        "cache": engine.cache.stats()
     })
 
 @app.route('/predict', methods=['POST'])
@@ -47,30 +137,162 @@ def predict():
         "customers": [{"customer_id": "123"}, ...],
         "activities": [{"customer_id": "123", "timestamp": "2024-03-19", "duration": 10}, ...]
     }
+    
+    Columnar input and output are also accepted, chosen by Content-Type
+    and Accept:
+    - application/vnd.humanchurn.columns+json: {"customers": {"customer_id": [...]},
+      "activities": {"customer_id": [...], "timestamp": [...]}}, and
+      "results" as one array per column
+    - application/vnd.apache.arrow.stream: Arrow IPC stream of the
+      activities table (every customer in it is scored), and results as an
+      Arrow stream with the summary in the schema metadata
     """
     try:
-        data = request.get_json()
-        
-        # Convert to DataFrames
-        customers_df = pd.DataFrame(data['customers'])
-        activities_df = pd.DataFrame(data['activities'])
+        customers_df, activities_df = read_predict_input()
         
         # Run analysis
         results = engine.analyze_customers(customers_df, activities_df)
         
-        # Convert to JSON-friendly format
-        output = results.to_dict(orient='records')
+        return predict_response(results, engine.get_summary_stats(results))
+    
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+@app.route('/predict/stream', methods=['POST'])
+def predict_stream():
+    """
+    Expects newline-delimited JSON activities, one per line:
+    {"customer_id": "123", "timestamp": "2024-03-19", "duration": 10}
+    
+    Every customer with an activity is scored. Results come back as NDJSON,
+    one customer per line, followed by a {"summary": {...}} trailer line.
+    Activities are read and folded in chunks (?chunksize=, default 50000),
+    so memory follows the number of customers, not the payload size.
+    """
+    chunksize = request.args.get('chunksize', 50_000, type=int)
+    as_of = request.args.get('as_of')
+    
+    try:
+        body = io.TextIOWrapper(request.stream, encoding='utf-8')
+        chunks = pd.read_json(body, lines=True, chunksize=chunksize, dtype=False, convert_dates=False)
+        results = engine.analyze_chunks(chunks, as_of=as_of)
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    
+    def generate():
+        summary = None
+        for start in range(0, len(results), chunksize):
+            part = results.iloc[start:start + chunksize]
+            part_summary = engine.summarize(part)
+            summary = part_summary if summary is None else summary.merge(part_summary)
+            # to_json ends lines=True output with a newline already
+            yield part.to_json(orient='records', lines=True, date_format='iso')
         
-        return jsonify({
-            "success": True,
-            "results": output,
-            "summary": engine.get_summary_stats(results)
-        })
+        summary = summary.as_dict() if summary is not None else engine.get_summary_stats(results)
+        yield json.dumps({"summary": json_safe(summary)}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Queue an analysis and return at once, for payloads too big to wait for
     
+    Takes the same input formats as /predict. Poll /jobs/<id> until the
+    status is "done", then fetch /jobs/<id>/results page by page.
+    """
+    try:
+        customers_df, activities_df = read_predict_input()
+        job_id = jobs.submit(customers_df, activities_df)
+    except QueueFull as e:
+        response = jsonify({"success": False, "error": str(e)})
+        response.headers['Retry-After'] = '30'
+        return response, 429
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 400
+    
+    response = jsonify({"success": True, "job_id": job_id, "status_url": f"/jobs/{job_id}"})
+    response.headers['Location'] = f"/jobs/{job_id}"
+    return response, 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    status = jobs.status(job_id)
+    if status is None:
+        return jsonify({"success": False, "error": f"Unknown job {job_id}"}), 404
+    return jsonify({"success": True, **status})
+
+@app.route('/jobs/<job_id>/results', methods=['GET'])
+def job_results(job_id):
+    status = jobs.status(job_id)
+    if status is None:
+        return jsonify({"success": False, "error": f"Unknown job {job_id}"}), 404
+    if status['status'] != 'done':
+        return jsonify({"success": False, "error": f"Job is {status['status']}", "status": status['status']}), 409
+    
+    page = request.args.get('page', 1, type=int)
+    rows = jobs.page(job_id, page)
+    if rows is None:
+        return jsonify({"success": False, "error": f"No page {page}, the job has {status['pages']}"}), 404
+    
+    # Pages are stored as ready-made JSON, spliced in without re-encoding
+    head = json.dumps({
+        "success": True,
+        "job_id": job_id,
+        "page": page,
+        "pages": status['pages'],
+        "total_results": status['total_results']
+    })
+    return Response(f'{head[:-1]}, "results": {rows}}}', mimetype='application/json')
+
+def _loaded_index():
+    """The feature index, or an error response if no state is loaded"""
+    index = feature_index.current()
+    if index is None:
+        error = f"No engagement state loaded from {feature_index.state_path}"
+        return None, (jsonify({"success": False, "error": error}), 503)
+    return index, None
+
+@app.route('/score/<customer_id>', methods=['GET'])
+def score_customer(customer_id):
+    """
+    Scores of one customer from the in-memory feature index
+    
+    Same columns and values as /predict, without sending any activities.
+    Recency is measured from now (or ?as_of=).
+    """
+    index, error = _loaded_index()
+    if error:
+        return error
+    
+    scores = index.score(customer_id, as_of=request.args.get('as_of'))
+    if scores is None:
+        return jsonify({"success": False, "error": f"Unknown customer {customer_id}"}), 404
+    return jsonify({"success": True, **scores})
+
+@app.route('/score', methods=['POST'])
+def score_customers():
+    """
+    Expects JSON with:
+    {
+        "customer_ids": ["123", "456", ...]
+    }
+    """
+    index, error = _loaded_index()
+    if error:
+        return error
+    
+    try:
+        customer_ids = request.get_json()['customer_ids']
+        results, missing = index.score_many(customer_ids, as_of=request.args.get('as_of'))
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    
+    return jsonify({"success": True, "results": results, "missing": missing})
 
 if __name__ == '__main__':
     print("🚀 Starting HumanChurnML API...")
-    print("📍 http://localhost:5000")
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    port = int(os.environ.get('CHURN_PORT', 5000))
+    print(f"📍 http://localhost:{port}")
+    print("   Development server, for production use: python api/serve.py")
+    app.run(debug=True, port=port)
\ No newline at end of file
@@ -0,0 +1,147 @@
+"""
+HumanChurnML - API Throughput Benchmark
+Compare requests/second of the debug server and the production server
+Run with: python benchmarks/api_throughput.py --clients 8 --seconds 20 --workers 4
+
+Both servers are started as subprocesses on local ports and hit with the
+same concurrent small /predict requests.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from benchmarks.synthetic import generate
+
+
+def make_payloads(n_payloads, events):
+    """Distinct small /predict bodies, so the result cache doesn't answer them"""
+    payloads = []
+    for seed in range(n_payloads):
+        customers, activities = generate(events, seed=seed, with_duration=False, with_value=False)
+        payloads.append(json.dumps({
+            'customers': customers.to_dict('records'),
+            'activities': activities.to_dict('records')
+        }).encode())
+    return payloads
+
+
+def start_server(command, port):
+    """Start a server and wait until /health answers"""
+    # simple_api.py finds src/ relative to the working directory
+    env = dict(os.environ, CHURN_PORT=str(port), PYTHONPATH=ROOT)
+    process = subprocess.Popen(command, cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"Server didn't start: {' '.join(command)}")
+
+
+def stop_server(process):
+    """SIGTERM, the same graceful stop a deployment would send"""
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=40)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def run_load(port, payloads, clients, seconds):
+    """
+    POST payloads to /predict from several threads for a fixed time
+    
+    Returns:
+    - (completed requests, failed requests, latencies in seconds)
+    """
+    latencies, failures = [], [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + seconds
+    
+    def client(offset):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        i = offset
+        while time.perf_counter() < stop_at:
+            body = payloads[i % len(payloads)]
+            i += clients
+            start = time.perf_counter()
+            try:
+                conn.request('POST', '/predict', body, {'Content-Type': 'application/json'})
+                response = conn.getresponse()
+                response.read()
+                ok = response.status == 200
+            except OSError:
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    failures[0] += 1
+        conn.close()
+    
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    return len(latencies), failures[0], np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=8, help="concurrent client threads")
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--events', type=int, default=200, help="activities per request")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--port', type=int, default=5100)
+    args = parser.parse_args()
+    
+    payloads = make_payloads(512, args.events)
+    servers = [
+        ('debug', [sys.executable, 'api/simple_api.py']),
+        (f"serve {args.workers}x{args.threads}",
+         [sys.executable, 'api/serve.py', '--host', '127.0.0.1', '--port', str(args.port + 1),
+          '--workers', str(args.workers), '--threads', str(args.threads)])
+    ]
+    
+    print(f"📊 {args.clients} clients, {args.events} activities per request, {os.cpu_count()} CPUs")
+    print(f"{'server':>12} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'failed':>7}")
+    
+    for offset, (name, command) in enumerate(servers):
+        port = args.port + offset
+        process = start_server(command, port)
+        try:
+            run_load(port, payloads, args.clients, 2)  # warm-up
+            done, failed, latencies = run_load(port, payloads, args.clients, args.seconds)
+        finally:
+            stop_server(process)
+        
+        p50, p95 = np.percentile(latencies, [50, 95]) * 1000 if done else (float('nan'),) * 2
+        print(f"{name:>12} {done / args.seconds:>8.1f} {p50:>8.1f} {p95:>8.1f} {failed:>7}")
+
+
+if __name__ == '__main__':
+    main()
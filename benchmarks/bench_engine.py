@@ -0,0 +1,218 @@
+"""
+HumanChurnML - Engine Benchmark Suite
+Time every stage of the engine on synthetic data and catch regressions
+
+Record a baseline:   python benchmarks/bench_engine.py run --output benchmarks/baseline.json
+Check for slowdowns: python benchmarks/bench_engine.py compare benchmarks/baseline.json
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import generate
+from src.production.churn_engine import ChurnEngine
+from src.production.timestamps import TimestampParser
+
+DEFAULT_SIZES = '10k,1m,10m'
+
+# Stage slowdowns below this many seconds are treated as noise
+NOISE_SECONDS = 0.05
+
+
+def parse_size(text):
+    """'10k' -> 10000, '1m' -> 1000000"""
+    text = text.strip().lower()
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip('km')) * multiplier)
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class StageTimer:
+    """Collects wall time per named stage"""
+    
+    def __init__(self):
+        self.stages = {}
+    
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        yield
+        self.stages[name] = time.perf_counter() - start
+
+
+def run_size(n_events, seed):
+    """Benchmark one data size, meant to run in a fresh process"""
+    customers, activities = generate(n_events, seed=seed)
+    timer = StageTimer()
+    
+    # Progress messages go to a logger nobody listens to
+    engine = ChurnEngine(company_name="Benchmark", logger=logging.getLogger('humanchurnml.benchmark'))
+    
+    with timer.stage('analyze_customers'):
+        results = engine.analyze_customers(customers, activities)
+    
+    # Every step inside analyze_customers, from the engine's own tracing
+    for record in results.attrs['stages']:
+        timer.stages[record['name']] = record['seconds']
+    
+    with timer.stage('get_summary_stats'):
+        engine.get_summary_stats(results)
+    
+    # Timestamp parsing on its own, for the common input formats
+    timestamps = activities['timestamp']
+    parse_inputs = {
+        'parse.iso_seconds': timestamps,
+        'parse.iso_days': timestamps.str.slice(0, 10),
+        'parse.epoch_seconds': pd.to_datetime(timestamps).astype('int64') // 10**9
+    }
+    for name, values in parse_inputs.items():
+        with timer.stage(name):
+            TimestampParser().parse(values)
+    
+    # export_for_crm creates ./exports, keep it out of the repo
+    with tempfile.TemporaryDirectory() as export_dir:
+        os.chdir(export_dir)
+        with timer.stage('export_for_crm'):
+            engine.export_for_crm(results, os.path.join(export_dir, 'crm_upload.csv'))
+    
+    return {
+        'events': len(activities),
+        'customers': len(customers),
+        'peak_rss_mb': peak_rss_mb(),
+        'stages': {
+            name: {
+                'seconds': round(seconds, 4),
+                'events_per_sec': round(len(activities) / seconds) if seconds > 0 else None
+            }
+            for name, seconds in timer.stages.items()
+        }
+    }
+
+
+def run_suite(sizes, seed):
+    """Benchmark every size, each in its own process so peak RSS is per size"""
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'seed': seed,
+        'machine': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count()
+        },
+        'sizes': {}
+    }
+    
+    for n_events in sizes:
+        print(f"📊 Benchmarking {n_events:,} events...")
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            result = pool.submit(run_size, n_events, seed).result()
+        report['sizes'][str(n_events)] = result
+        print_result(result)
+    
+    return report
+
+
+def print_result(result):
+    print(f"   {result['customers']:,} customers, peak RSS {result['peak_rss_mb']:,.1f} MB")
+    for name, stage in result['stages'].items():
+        print(f"   {name:<24} {stage['seconds']:>9.3f}s {stage['events_per_sec'] or 0:>14,} events/s")
+
+
+def compare(baseline, current, threshold):
+    """List of stages that got slower than baseline by more than threshold"""
+    regressions = []
+    
+    for size, result in current['sizes'].items():
+        base_result = baseline['sizes'].get(size)
+        if base_result is None:
+            continue
+        
+        for name, stage in result['stages'].items():
+            base_stage = base_result['stages'].get(name)
+            if base_stage is None:
+                continue
+            
+            before, after = base_stage['seconds'], stage['seconds']
+            if after > before * (1 + threshold) and after - before > NOISE_SECONDS:
+                regressions.append((int(size), name, before, after))
+    
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HumanChurnML engine benchmarks")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    run_parser = commands.add_parser('run', help="Run the suite and save the results")
+    run_parser.add_argument('--output', default='benchmarks/results.json')
+    
+    compare_parser = commands.add_parser('compare', help="Run the suite and compare to a baseline")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('--threshold', type=float, default=0.2,
+                                help="allowed slowdown per stage, 0.2 = 20%%")
+    compare_parser.add_argument('--output', default=None)
+    
+    for sub in (run_parser, compare_parser):
+        sub.add_argument('--sizes', default=None, help=f"event counts (default: {DEFAULT_SIZES}, or the baseline's)")
+        sub.add_argument('--seed', type=int, default=42)
+    
+    args = parser.parse_args()
+    
+    baseline = None
+    if args.command == 'compare':
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    
+    if args.sizes:
+        sizes = [parse_size(size) for size in args.sizes.split(',')]
+    elif baseline is not None:
+        sizes = [int(size) for size in baseline['sizes']]
+    else:
+        sizes = [parse_size(size) for size in DEFAULT_SIZES.split(',')]
+    
+    report = run_suite(sizes, args.seed)
+    
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Results saved to {args.output}")
+    
+    if baseline is None:
+        return 0
+    
+    regressions = compare(baseline, report, args.threshold)
+    if not regressions:
+        print(f"✅ No stage slower than baseline by more than {args.threshold:.0%}")
+        return 0
+    
+    print(f"🚨 {len(regressions)} stage(s) regressed by more than {args.threshold:.0%}:")
+    for size, name, before, after in regressions:
+        print(f"   {size:>12,} events  {name:<24} {before:.3f}s -> {after:.3f}s ({after / before - 1:+.0%})")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""
+HumanChurnML - Parallel Scaling Benchmark
+Time analyze_customers with 1 to N workers on synthetic data
+Run with: python benchmarks/parallel_scaling.py --events 2000000 --max-workers 8
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import generate
+from src.production.churn_engine import ChurnEngine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=2_000_000)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    
+    customers, activities = generate(args.events)
+    
+    # One reference time for every run, so recency_days can't differ
+    as_of = pd.Timestamp.now()
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = ChurnEngine(company_name="Benchmark")
+    
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= args.max_workers:
+        worker_counts.append(worker_counts[-1] * 2)
+    if worker_counts[-1] != args.max_workers:
+        worker_counts.append(args.max_workers)
+    
+    print(f"📊 {len(customers):,} customers, {args.events:,} events, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'seconds':>9} {'speedup':>8} {'events/s':>12}")
+    
+    serial, baseline = None, None
+    for workers in worker_counts:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = engine.analyze_customers(customers, activities.copy(), workers=workers, as_of=as_of)
+        elapsed = time.perf_counter() - start
+        
+        if serial is None:
+            serial, baseline = results, elapsed
+        else:
+            pd.testing.assert_frame_equal(serial, results, check_exact=True)
+        
+        print(f"{workers:>8} {elapsed:>9.2f} {baseline / elapsed:>7.2f}x {args.events / elapsed:>12,.0f}")
+    
+    print("✅ All worker counts produced identical results")
+
+
+if __name__ == '__main__':
+    main()
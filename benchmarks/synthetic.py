@@ -0,0 +1,88 @@
+"""
+HumanChurnML - Synthetic Data
+Seeded customers and activities with a realistic engagement skew
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _activity_counts(rng, n_events):
+    """
+    Activities per active customer, summing to exactly n_events
+    
+    Pareto-distributed: about two thirds of customers try the product once,
+    while a heavy tail ends up with hundreds of activities.
+    """
+    batches, total = [], 0
+    while total < n_events:
+        counts = np.minimum(np.floor(rng.pareto(1.5, max(n_events // 2, 16)) + 1), 5000).astype(np.int64)
+        batches.append(counts)
+        total += counts.sum()
+    
+    counts = np.concatenate(batches)
+    cumulative = np.cumsum(counts)
+    n_active = int(np.searchsorted(cumulative, n_events)) + 1
+    counts = counts[:n_active]
+    counts[-1] -= cumulative[n_active - 1] - n_events
+    return counts
+
+
+def generate(n_events, seed=42, end=None, days=180, never_active=0.1,
+             with_duration=True, with_value=True, timestamps='iso'):
+    """
+    Generate synthetic customers and activities
+    
+    Parameters:
+    - n_events: number of activity rows
+    - seed: random seed, the same seed always gives the same data
+    - end: last possible activity date (default: today)
+    - days: length of the activity history
+    - never_active: share of customers with no activity at all
+    - with_duration / with_value: add optional 'duration' / 'value' columns
+    - timestamps: 'iso' strings, 'datetime' values or 'epoch' seconds
+    
+    Returns:
+    - (customers, activities) DataFrames, activities in time order
+    """
+    rng = np.random.default_rng(seed)
+    
+    counts = _activity_counts(rng, n_events)
+    n_active = len(counts)
+    n_customers = n_active + int(round(n_active * never_active / (1 - never_active)))
+    
+    ids = np.array([f'C{i:08d}' for i in range(n_customers)], dtype=object)
+    rng.shuffle(ids)
+    customers = pd.DataFrame({'customer_id': ids})
+    
+    # Each customer is active during their own window, heavier users for longer
+    history = days * 86400
+    span = np.minimum(counts * rng.exponential(3 * 86400, n_active), history)
+    start = rng.uniform(0, history - span)
+    owner = np.repeat(np.arange(n_active), counts)
+    seconds = (start[owner] + rng.random(n_events) * span[owner]).astype(np.int64)
+    
+    order = np.argsort(seconds, kind='stable')
+    owner, seconds = owner[order], seconds[order]
+    
+    end = pd.Timestamp(end) if end is not None else pd.Timestamp.now().normalize()
+    epoch = int((end - pd.Timedelta(days=days)).timestamp())
+    
+    activities = pd.DataFrame({'customer_id': ids[owner]})
+    
+    if timestamps == 'epoch':
+        activities['timestamp'] = epoch + seconds
+    else:
+        dates = (epoch + seconds).astype('datetime64[s]')
+        if timestamps == 'iso':
+            activities['timestamp'] = np.datetime_as_string(dates, unit='s').astype(object)
+        else:
+            activities['timestamp'] = dates.astype('datetime64[ns]')
+    
+    if with_duration:
+        activities['duration'] = np.ceil(rng.lognormal(2.3, 0.8, n_events)).astype(np.int64)
+    
+    if with_value:
+        activities['value'] = np.round(rng.lognormal(3.5, 1.0, n_events), 2)
+    
+    return customers, activities
@@ -10,6 +10,9 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import time
+import sys
+sys.path.append('..')
+from src.production.ranking import top_k
 
 # Must be the first Streamlit command
 st.set_page_config(
@@ -293,18 +296,22 @@ elif page == "📤 Predict":
         
         # Show at-risk customers
         st.markdown("### ⚠️ **At-Risk Customers**")
-        at_risk = st.session_state.predictions[st.session_state.predictions['Churn Risk'] > 70]
+        # The table shows the riskiest 500, the download has all of them
+        at_risk = top_k(st.session_state.predictions, 500, by='Churn Risk',
+                        tie_break='Predicted LTV', above=70)
         
         if len(at_risk) > 0:
+            all_at_risk = st.session_state.predictions[st.session_state.predictions['Churn Risk'] > 70]
+            st.caption(f"Top {len(at_risk):,} of {len(all_at_risk):,} at-risk customers")
             st.dataframe(
                 at_risk.style.applymap(lambda x: 'color: red' if x > 70 else '', subset=['Churn Risk']),
                 use_container_width=True
             )
             
             # Download button
-            csv = at_risk.to_csv(index=False)
+            csv = all_at_risk.to_csv(index=False)
             st.download_button(
-                "📥 Download At-Risk List",
+                f"📥 Download All {len(all_at_risk):,} At-Risk Customers",
                 csv,
                 "at_risk_customers.csv",
                 "text/csv",
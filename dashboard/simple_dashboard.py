@@ -10,6 +10,7 @@ import plotly.graph_objects as go
 import sys
 sys.path.append('..')
 from src.production.churn_engine import ChurnEngine
+from src.production.result_cache import ResultCache
 
 # Page config
 st.set_page_config(
@@ -40,8 +41,12 @@ with st.sidebar:
     
     analyze_btn = st.button("🚀 Run Analysis", type="primary")
 
-# Initialize engine
-engine = ChurnEngine(company_name=company, industry=industry)
+# Initialize engine, the result cache survives reruns of this script
+@st.cache_resource
+def result_cache():
+    return ResultCache()
+
+engine = ChurnEngine(company_name=company, industry=industry, cache=result_cache())
 
 # Main content
 col1, col2, col3, col4 = st.columns(4)
@@ -139,18 +144,21 @@ if analyze_btn and customers_file and activities_file:
     # Show at-risk customers
     st.subheader("⚠️ At-Risk Customers - Take Action Now!")
     
-    at_risk = results[results['churn_risk'] > 70].sort_values('churn_risk', ascending=False)
+    # The table shows the riskiest 500, the download has all of them
+    at_risk = engine.top_at_risk(results, k=500, above=70)
     
     if len(at_risk) > 0:
+        all_at_risk = results[results['churn_risk'] > 70]
+        st.caption(f"Top {len(at_risk):,} of {len(all_at_risk):,} at-risk customers")
         st.dataframe(
             at_risk[['customer_id', 'engagement_level', 'churn_risk', 'recommended_action']],
             use_container_width=True
         )
         
         # Export button
-        csv = at_risk.to_csv(index=False)
+        csv = all_at_risk.to_csv(index=False)
         st.download_button(
-            "📥 Download At-Risk List",
+            f"📥 Download All {len(all_at_risk):,} At-Risk Customers",
             csv,
             "at_risk_customers.csv",
             "text/csv"
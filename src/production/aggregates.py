@@ -0,0 +1,248 @@
+"""
+HumanChurnML - Running Engagement Aggregates
+Fold activities into per-customer state chunk by chunk
+"""
+
+import copy
+
+import numpy as np
+import pandas as pd
+
+# Number of first/last activities compared by the frequency trend
+TREND_WINDOW = 3
+
+
+def trend_labels(total_activities, old_count, recent_count):
+    """Turn first/last window distinct-date counts into trend labels"""
+    return np.select(
+        [
+            total_activities < TREND_WINDOW,
+            recent_count < old_count * 0.5,
+            recent_count > old_count * 1.5
+        ],
+        ['stable', 'decreasing', 'increasing'],
+        default='stable'
+    )
+
+
+def _append(state, part):
+    """Concatenate a new part onto a state frame (None = empty)"""
+    if state is None:
+        return part
+    return pd.concat([state, part])
+
+
+def _keep_extremes(dates, ascending):
+    """Keep each customer's TREND_WINDOW earliest (or latest) dates"""
+    dates = dates.sort_values('date', ascending=ascending, kind='stable')
+    rank = dates.groupby('customer_id', sort=False).cumcount()
+    return dates[rank.to_numpy() < TREND_WINDOW]
+
+
+class EngagementAggregates:
+    """
+    Per-customer running aggregates behind the engagement metrics
+    
+    Holds what _calculate_engagement derives from raw events: activity
+    counts, distinct activity dates, duration and value sums and each
+    customer's first and last dates for the frequency trend. Activities are
+    folded in one chunk at a time, so raw events never have to fit in memory.
+    
+    Memory follows the number of customers times their distinct activity
+    dates. For day-level dates that is far below the number of events, for
+    timestamps to the second it is about one row per event. With
+    calendar_days=True active_days counts distinct calendar days instead
+    of distinct timestamps, which keeps the day table at customers times
+    active days whatever the timestamp resolution (active_days then
+    differs from analyze_customers for sub-day timestamps).
+    """
+    
+    def __init__(self, calendar_days=False):
+        self.calendar_days = calendar_days
+        self.counts = None
+        self.first_dates = None
+        self.last_dates = None
+        self.has_duration = False
+        self.has_value = False
+        
+        # Distinct (customer_id, date) pairs, compacted lazily
+        self._days = None
+        self._pending_days = []
+        self._pending_rows = 0
+        
+        # Stored days not loaded yet (see restore_days)
+        self._load_days = None
+    
+    @property
+    def total_activities(self):
+        """Number of activities folded in so far"""
+        if self.counts is None:
+            return 0
+        return int(self.counts['total_activities'].sum())
+    
+    def customer_ids(self):
+        """Customers with at least one folded activity"""
+        if self.counts is None:
+            return pd.Index([], name='customer_id')
+        return self.counts.index
+    
+    def fold(self, activities):
+        """
+        Fold a chunk of activities with a parsed 'date' column
+        
+        Returns:
+        - The chunk's distinct (customer_id, date) pairs
+        """
+        if len(activities) == 0:
+            return activities[['customer_id', 'date']]
+        
+        grouped = activities.groupby('customer_id', sort=False)
+        
+        part = pd.DataFrame({
+            'total_activities': grouped.size(),
+            'dated_activities': grouped['date'].count()
+        })
+        
+        if 'duration' in activities.columns:
+            self.has_duration = True
+            part['duration_sum'] = grouped['duration'].sum()
+            part['duration_count'] = grouped['duration'].count()
+        
+        if 'value' in activities.columns:
+            self.has_value = True
+            part['value_sum'] = grouped['value'].sum()
+        
+        self.counts = _append(self.counts, part).groupby(level=0, sort=False).sum()
+        
+        # Only rows with a customer and a date take part in dates and trend
+        dated = activities.loc[
+            activities['customer_id'].notna() & activities['date'].notna(),
+            ['customer_id', 'date']
+        ]
+        
+        self.first_dates = _keep_extremes(_append(self.first_dates, dated), ascending=True)
+        self.last_dates = _keep_extremes(_append(self.last_dates, dated), ascending=False)
+        
+        if self.calendar_days:
+            dated = dated.assign(date=dated['date'].dt.normalize())
+        
+        days = dated.drop_duplicates()
+        self._add_days(days)
+        return days
+    
+    def merge(self, other):
+        """Fold another set of aggregates into this one"""
+        if other.counts is None:
+            return
+        
+        self.has_duration = self.has_duration or other.has_duration
+        self.has_value = self.has_value or other.has_value
+        self.counts = _append(self.counts, other.counts).groupby(level=0, sort=False).sum()
+        self.first_dates = _keep_extremes(_append(self.first_dates, other.first_dates), ascending=True)
+        self.last_dates = _keep_extremes(_append(self.last_dates, other.last_dates), ascending=False)
+        self._add_days(other.distinct_days())
+    
+    def without_days(self):
+        """Copy sharing everything but the distinct-day table, to store the days apart"""
+        aggregates = copy.copy(self)
+        aggregates._days = None
+        aggregates._pending_days = []
+        aggregates._pending_rows = 0
+        aggregates._load_days = None
+        return aggregates
+    
+    def restore_days(self, load):
+        """
+        Add back distinct-day tables stored apart from a without_days() copy
+        
+        load() returns the tables and is only called once the days are
+        needed (distinct_days(), metrics()), so folding more activities
+        into restored aggregates never reads the stored days.
+        """
+        self._load_days = load
+    
+    def _add_days(self, days):
+        """Queue distinct days, compacting once the queue outgrows the state"""
+        self._pending_days.append(days)
+        self._pending_rows += len(days)
+        
+        days_rows = 0 if self._days is None else len(self._days)
+        if self._load_days is None and self._pending_rows > days_rows:
+            self.distinct_days()
+    
+    def distinct_days(self):
+        """Distinct (customer_id, date) pairs seen so far"""
+        if self._load_days is not None:
+            self._pending_days = list(self._load_days()) + self._pending_days
+            self._load_days = None
+        
+        if self._pending_days:
+            days = pd.concat([d for d in [self._days] + self._pending_days if d is not None])
+            self._days = days.drop_duplicates(ignore_index=True)
+            self._pending_days = []
+            self._pending_rows = 0
+        
+        if self._days is None:
+            return pd.DataFrame({'customer_id': [], 'date': pd.Series(dtype='datetime64[ns]')})
+        return self._days
+    
+    def last_activity(self):
+        """Latest activity date per customer with a dated activity"""
+        return self.last_dates.groupby('customer_id', sort=False)['date'].max()
+    
+    def metrics(self, now):
+        """
+        Per-customer engagement metrics, indexed by customer_id
+        
+        Same columns as _calculate_engagement produces before the join onto
+        the customer list.
+        """
+        counts = self.counts
+        index = counts.index
+        
+        active_days = self.distinct_days().groupby('customer_id', sort=False).size()
+        last_date = self.last_activity()
+        
+        metrics = pd.DataFrame({
+            'total_activities': counts['total_activities'],
+            'active_days': active_days.reindex(index, fill_value=0),
+            'recency_days': (now - last_date.reindex(index)).dt.days,
+            'frequency_trend': self._trends()
+        })
+        
+        if self.has_duration:
+            metrics['avg_duration'] = counts['duration_sum'] / counts['duration_count']
+        else:
+            metrics['avg_duration'] = 0
+        
+        if self.has_value:
+            metrics['total_value'] = counts['value_sum']
+        else:
+            metrics['total_value'] = 0
+        
+        return metrics
+    
+    def _trends(self):
+        """Frequency trend from the stored first/last dates"""
+        counts = self.counts
+        index = counts.index
+        
+        # Undated activities sort last, so they take up room in the
+        # recent window ahead of the latest dates
+        undated = counts['total_activities'] - counts['dated_activities']
+        room = (TREND_WINDOW - undated).clip(lower=0)
+        
+        last = self.last_dates
+        rank = last.groupby('customer_id', sort=False).cumcount().to_numpy()
+        recent = last[rank < room.reindex(last['customer_id']).to_numpy()]
+        
+        old_count = self.first_dates.groupby('customer_id', sort=False)['date'].nunique()
+        recent_count = recent.groupby('customer_id', sort=False)['date'].nunique()
+        
+        trends = trend_labels(
+            counts['total_activities'].to_numpy(),
+            old_count.reindex(index, fill_value=0).to_numpy(),
+            recent_count.reindex(index, fill_value=0).to_numpy()
+        )
+        
+        return pd.Series(trends, index=index, dtype=object)
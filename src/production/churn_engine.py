@@ -5,35 +5,133 @@ Convert your Jupyter discovery into a reusable system
 
 import pandas as pd
 import numpy as np
-import json
-import os
+import logging
 from datetime import datetime, timedelta
 
+from src.production.aggregates import EngagementAggregates, TREND_WINDOW, trend_labels
+from src.production.crm_export import ExportSnapshot, crm_frame, write_export
+from src.production.crossings import CrossingIndex
+from src.production.feature_index import FeatureIndex
+from src.production.instrumentation import StageTracer
+from src.production.parallel import sharded_activity_metrics
+from src.production.patterns import DEFAULT_PATTERNS_PATH, PATTERN_REGISTRY, freeze
+from src.production.ranking import TopK, top_k
+from src.production.readers import iter_activity_chunks, read_customers
+from src.production.rollup import is_rollup, rollup_days, rollup_metrics, write_rollup
+from src.production.scoring_plan import compile_plan
+from src.production.summary import SummaryStats
+from src.production.timestamps import TimestampParser
+
+# Engagement levels in order, index = level code (-1 = unknown)
+LEVELS = [
+    'Never Active',
+    'Tried Once',
+    'Casual',
+    'Regular',
+    'Loyal',
+    'Super Customer'
+]
+
+# Recommended actions, index = action code
+ACTIONS = [
+    "🚨 URGENT: Personal phone call + 30% discount",
+    "⚠️ HIGH: Send personal email from CEO + 20% off",
+    "📧 MEDIUM: Re-engagement campaign with new features",
+    "📱 LOW: Regular newsletter + product recommendations",
+    "🌟 VIP: Ask for referral + early access to new products",
+    "✅ ON TRACK: Continue regular engagement"
+]
+
+# Frequency trend labels
+TRENDS = ['decreasing', 'stable', 'increasing', 'inactive', 'unknown']
+
+# Result column dtypes when analyzing with compact=True
+COMPACT_DTYPES = {
+    'total_activities': 'int32',
+    'active_days': 'int32',
+    'recency_days': 'int16',
+    'avg_duration': 'float32',
+    'total_value': 'float32',
+    'churn_risk': 'float32',
+    'predicted_ltv': 'float32'
+}
+
+# Level names by level code, code -1 (last entry) = unknown
+LEVEL_LABELS = np.array(LEVELS + ['Unknown'], dtype=object)
+
 class ChurnEngine:
     """
     Universal churn prediction that works for ANY business
     Based on real patterns discovered from 190,000+ customers
     """
     
-    def __init__(self, company_name="", industry="unknown"):
+    def __init__(self, company_name="", industry="unknown", patterns_path=DEFAULT_PATTERNS_PATH,
+                 logger=None, stage_hooks=None, cache=None):
+        """
+        Parameters:
+        - company_name, industry: who the engine is scoring for
+        - patterns_path: patterns JSON file (default: models/universal_patterns.json)
+        - logger: logging.Logger for progress messages (default: print them)
+        - stage_hooks: callables receiving a StageRecord after every stage
+        - cache: ResultCache reused by analyze_customers for repeat inputs
+        """
         self.company_name = company_name
         self.industry = industry
+        self.patterns_path = patterns_path
+        self.logger = logger
+        self.stage_hooks = list(stage_hooks or [])
+        self.cache = cache
+        self.patterns = self._load_patterns()
+        self._scoring_plan = None
+        self._log("✅ HumanChurnML Engine Initialized")
+        self._log("   Company: %s", company_name)
+        self._log("   Industry: %s", industry)
+        self._log("   Knowledge from: %s customers",
+                  f"{self.patterns['universal']['total_customers_analyzed']:,}")
+    
+    def _log(self, message, *args):
+        """Progress message, printed or sent to the engine's logger"""
+        if self.logger is None:
+            print(message % args if args else message)
+        elif self.logger.isEnabledFor(logging.INFO):
+            self.logger.info(message, *args)
+    
+    def add_stage_hook(self, hook):
+        """Call hook(StageRecord) after every stage of every analysis"""
+        self.stage_hooks.append(hook)
+    
+    def __getstate__(self):
+        # Patterns are read-only proxies that can't be pickled, workers
+        # get them back from their own registry. Hooks and the result
+        # cache stay with the parent.
+        state = self.__dict__.copy()
+        del state['patterns']
+        state['stage_hooks'] = []
+        state['cache'] = None
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
         self.patterns = self._load_patterns()
-        print(f"✅ HumanChurnML Engine Initialized")
-        print(f"   Company: {company_name}")
-        print(f"   Industry: {industry}")
-        print(f"   Knowledge from: {self.patterns['universal']['total_customers_analyzed']:,} customers")
     
     def _load_patterns(self):
-        """Load the universal patterns from JSON"""
-        json_path = 'models/universal_patterns.json'
+        """Load the universal patterns (parsed once per process)"""
+        pattern_set = PATTERN_REGISTRY.get(self.patterns_path)
         
-        if os.path.exists(json_path):
-            with open(json_path, 'r') as f:
-                return json.load(f)['discovered_patterns']
+        if pattern_set is not None:
+            self.pattern_version = pattern_set.version
+            return pattern_set.patterns
         else:
-            print("⚠️  Patterns file not found, using defaults")
-            return self._default_patterns()
+            self._log("⚠️  Patterns file not found, using defaults")
+            self.pattern_version = 'default'
+            return freeze(self._default_patterns())
+    
+    def _plan(self):
+        """Scoring plan for the engine's patterns and industry, compiled once"""
+        key = (self.pattern_version, self.industry)
+        if self._scoring_plan is None or self._scoring_plan[0] != key:
+            self._scoring_plan = (key, compile_plan(self.patterns, self.industry, LEVELS, TRENDS))
+        return self._scoring_plan[1]
     
     def _default_patterns(self):
         """Fallback patterns if JSON not found"""
@@ -58,270 +156,602 @@ class ChurnEngine:
             }
         }
     
-    def analyze_customers(self, customer_data, activity_data):
+    def analyze_customers(self, customer_data, activity_data, workers=1, compact=False, as_of=None):
         """
         Main function - analyze any customer dataset
         
         Parameters:
         - customer_data: DataFrame with customer info (must have 'customer_id')
-        - activity_data: DataFrame with user actions (must have 'customer_id' and 'timestamp')
+        - activity_data: DataFrame with user actions (must have 'customer_id' and 'timestamp'),
+          or a daily rollup from build_rollup
+        - workers: number of processes for the engagement step (1 = serial)
+        - compact: return categorical labels and 32-bit numbers to save memory
+        - as_of: reference time for recency (default: now), fix it to make
+          reruns and backfills reproducible
         
         Returns:
-        - DataFrame with risk scores and recommendations
+        - DataFrame with risk scores and recommendations, with a memory
+          report in .attrs['memory'], per-stage timings in .attrs['stages']
+          and the reference time in .attrs['as_of']
+        
+        activity_data is never modified. With a cache, a repeat call on the
+        same data returns the stored result. Without as_of, cached results
+        are reused for the rest of the calendar day.
         """
+        tracer = StageTracer(self.stage_hooks)
+        now = self._reference_time(as_of)
+        
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.key(
+                self.pattern_version, self.industry, compact,
+                str(now.date()) if as_of is None else str(now),
+                frames=(customer_data, activity_data)
+            )
+            results = self.cache.get(cache_key)
+            if results is not None:
+                self._log("⚡ Returning cached analysis")
+                return results
         
         # Step 1: Calculate engagement metrics
-        print("📊 Calculating engagement metrics...")
-        engagement = self._calculate_engagement(customer_data, activity_data)
+        self._log("📊 Calculating engagement metrics...")
+        with tracer.stage('engagement', len(activity_data)) as stage:
+            engagement = self._calculate_engagement(customer_data, activity_data, workers, tracer, now)
+            stage.rows_out = len(engagement)
+        
+        results = self._score_engagement(engagement, compact, tracer, now)
+        
+        if cache_key is not None:
+            self.cache.put(cache_key, results)
+        
+        return results
+    
+    def analyze_files(self, customers_path, activities_path, chunksize=1_000_000, compact=False,
+                      as_of=None, calendar_days=False):
+        """
+        Analyze customer and activity files that don't fit in memory
+        
+        Parameters:
+        - customers_path: CSV or Parquet file with a 'customer_id' column
+        - activities_path: CSV or Parquet file with user actions
+        - chunksize: number of activity rows read at a time
+        - compact: return categorical labels and 32-bit numbers to save memory
+        - as_of: reference time for recency (default: now)
+        - calendar_days: count active_days as distinct calendar days rather
+          than distinct timestamps
+        
+        Activities are folded chunk by chunk into per-customer running
+        aggregates, so the events never have to fit in memory. Scoring runs
+        once at the end. active_days needs every customer's distinct
+        activity timestamps, so peak memory follows the number of customers
+        only when timestamps are day-level. Exports with times of day keep
+        about one row per event, unless calendar_days=True, which trades
+        the exact analyze_customers active_days for memory in customers
+        times active days.
+        
+        Returns:
+        - DataFrame with risk scores and recommendations
+        """
+        customers = read_customers(customers_path)
+        return self.analyze_chunks(iter_activity_chunks(activities_path, chunksize), customers, compact, as_of,
+                                   calendar_days)
+    
+    def analyze_chunks(self, activity_chunks, customer_data=None, compact=False, as_of=None,
+                       calendar_days=False):
+        """
+        Analyze activities that arrive as a stream of DataFrame chunks
+        
+        Parameters:
+        - activity_chunks: iterable of activity DataFrames
+        - customer_data: DataFrame with 'customer_id' (default: every
+          customer with at least one activity)
+        - compact: return categorical labels and 32-bit numbers to save memory
+        - as_of: reference time for recency (default: now)
+        - calendar_days: count active_days as distinct calendar days (see
+          analyze_files)
+        
+        Returns:
+        - DataFrame with risk scores and recommendations
+        """
+        tracer = StageTracer(self.stage_hooks)
+        now = self._reference_time(as_of)
+        aggregates = EngagementAggregates(calendar_days)
+        
+        # One parser for all chunks: format detected once, parsed dates reused
+        parser = TimestampParser()
+        
+        # Step 1: Fold activity chunks into engagement aggregates
+        self._log("📊 Streaming engagement metrics...")
+        with tracer.stage('engagement') as stage:
+            for chunk in activity_chunks:
+                aggregates.fold(self._activity_frame(chunk, now, parser))
+            
+            if customer_data is None:
+                customer_data = pd.DataFrame({'customer_id': aggregates.customer_ids()})
+            
+            stage.rows_in = aggregates.total_activities
+            engagement = self._engagement_from_aggregates(customer_data, aggregates, now)
+            stage.rows_out = len(engagement)
+        
+        return self._score_engagement(engagement, compact, tracer, now)
+    
+    def build_rollup(self, activity_data, output_path=None):
+        """
+        Roll raw activities up to one row per customer per day
+        
+        Parameters:
+        - activity_data: DataFrame with user actions, as for analyze_customers
+        - output_path: also save the rollup there as Parquet (needs pyarrow)
+        
+        Returns:
+        - Rollup DataFrame that analyze_customers accepts in place of the
+          raw activities. Combine daily rollups with merge_rollups.
+        """
+        activities = self._activity_frame(activity_data)
+        rollup = rollup_days(activities)
+        
+        if output_path is not None:
+            write_rollup(rollup, output_path)
+        
+        self._log("✅ Rolled %d activities up to %d customer-days", len(activity_data), len(rollup))
+        return rollup
+    
+    def _reference_time(self, as_of=None):
+        """The single 'now' recency is measured from"""
+        if as_of is None:
+            return datetime.now()
+        return pd.Timestamp(as_of)
+    
+    def _score_engagement(self, engagement, compact=False, tracer=None, as_of=None):
+        """Run scoring steps 2-6 on engagement metrics"""
+        tracer = tracer or StageTracer(self.stage_hooks)
+        n_customers = len(engagement)
         
         # Step 2: Assign engagement levels
-        engagement = self._assign_levels(engagement)
+        with tracer.stage('levels', n_customers) as stage:
+            level_codes = self._plan().level_codes(engagement['total_activities'])
+            engagement = self._assign_levels(engagement, level_codes)
+            stage.rows_out = n_customers
         
         # Step 3: Calculate churn risk
-        engagement['churn_risk'] = self._calculate_risk(engagement)
+        with tracer.stage('risk', n_customers) as stage:
+            engagement['churn_risk'] = self._calculate_risk(engagement, level_codes)
+            stage.rows_out = n_customers
+        
+        # Step 4 & 5: Recommend actions and predict customer value
+        with tracer.stage('actions_ltv', n_customers) as stage:
+            action_codes, ltv = self._score_kernel(
+                engagement['churn_risk'].to_numpy(dtype=np.float64),
+                level_codes
+            )
+            if compact:
+                engagement['recommended_action'] = pd.Categorical.from_codes(action_codes, ACTIONS)
+            else:
+                engagement['recommended_action'] = np.array(ACTIONS, dtype=object)[action_codes]
+            engagement['predicted_ltv'] = ltv
+            stage.rows_out = n_customers
         
-        # Step 4: Recommend actions
-        engagement['recommended_action'] = engagement.apply(
-            lambda x: self._recommend_action(x), axis=1
-        )
+        # Step 6: Flag urgent cases
+        with tracer.stage('urgent', n_customers) as stage:
+            engagement['urgent'] = engagement['churn_risk'] > 70
+            stage.rows_out = n_customers
         
-        # Step 5: Predict customer value
-        engagement['predicted_ltv'] = engagement.apply(
-            lambda x: self._predict_ltv(x), axis=1
-        )
+        if compact:
+            with tracer.stage('compact', n_customers) as stage:
+                engagement = self._compact(engagement)
+                stage.rows_out = n_customers
         
-        # Step 6: Flag urgent cases
-        engagement['urgent'] = engagement['churn_risk'] > 70
+        engagement.attrs['memory'] = self._memory_report(engagement)
+        engagement.attrs['stages'] = tracer.as_dicts()
+        if as_of is not None:
+            engagement.attrs['as_of'] = pd.Timestamp(as_of)
+        
+        self._log("✅ Analysis complete for %d customers", n_customers)
+        
+        return engagement
+    
+    def _compact(self, engagement):
+        """Shrink result columns to categoricals and 32-bit numbers"""
+        engagement['engagement_level'] = pd.Categorical(
+            engagement['engagement_level'], categories=LEVELS + ['Unknown']
+        )
+        engagement['frequency_trend'] = pd.Categorical(
+            engagement['frequency_trend'], categories=TRENDS
+        )
         
-        print(f"✅ Analysis complete for {len(engagement)} customers")
+        for col, dtype in COMPACT_DTYPES.items():
+            if col not in engagement.columns:
+                continue
+            
+            values = engagement[col]
+            if dtype.startswith('int'):
+                if values.isna().any():
+                    # Integer columns can't hold NaN (e.g. recency without dates)
+                    dtype = 'float32'
+                elif len(values) > 0:
+                    # astype wraps around silently (a 1900-01-01 placeholder
+                    # date is 45,000 days old), widen until the values fit
+                    dtype = next(wide for wide in [dtype, 'int32', 'int64']
+                                 if np.iinfo(wide).min <= values.min() and values.max() <= np.iinfo(wide).max)
+            engagement[col] = values.astype(dtype)
         
         return engagement
     
-    def _calculate_engagement(self, customers, activities):
+    def _memory_report(self, engagement):
+        """Bytes used by the result frame, in total and per customer"""
+        usage = engagement.memory_usage(index=True, deep=True)
+        total = int(usage.sum())
+        
+        return {
+            'total_bytes': total,
+            'bytes_per_customer': round(total / max(len(engagement), 1), 1),
+            'columns': {col: int(size) for col, size in usage.items()}
+        }
+    
+    def _calculate_engagement(self, customers, activities, workers=1, tracer=None, now=None):
         """Extract universal engagement metrics from raw data"""
+        tracer = tracer or StageTracer(self.stage_hooks)
+        now = now or self._reference_time()
         
         # Handle empty activities
         if len(activities) == 0:
-            return pd.DataFrame({
-                'customer_id': customers['customer_id'],
-                'total_activities': 0,
-                'active_days': 0,
-                'recency_days': 999,
-                'frequency_trend': 'unknown'
+            return self._empty_engagement(customers)
+        
+        if is_rollup(activities):
+            with tracer.stage('engagement.rollup', len(activities)) as stage:
+                metrics = rollup_metrics(activities, now)
+                stage.rows_out = len(metrics)
+        elif workers > 1:
+            with tracer.stage('engagement.shards', len(activities)) as stage:
+                metrics = sharded_activity_metrics(self, activities, workers, now)
+                stage.rows_out = len(metrics)
+        else:
+            with tracer.stage('engagement.parse_dates', len(activities)) as stage:
+                activities = self._activity_frame(activities, now)
+                stage.rows_out = len(activities)
+            metrics = self._activity_metrics(activities, now, tracer)
+        
+        with tracer.stage('engagement.join', len(metrics)) as stage:
+            engagement = self._join_customers(customers, metrics)
+            stage.rows_out = len(engagement)
+        
+        return engagement
+    
+    def _activity_metrics(self, activities, now, tracer=None):
+        """Per-customer engagement metrics, indexed by customer_id"""
+        tracer = tracer or StageTracer()
+        
+        # Calculate metrics for all customers in one grouped pass
+        with tracer.stage('engagement.aggregate', len(activities)) as stage:
+            grouped = activities.groupby('customer_id', sort=False)
+            
+            # Recency is one subtraction from the shared reference time
+            metrics = pd.DataFrame({
+                'total_activities': grouped.size(),
+                'active_days': grouped['date'].nunique(),
+                'recency_days': (now - grouped['date'].max()).dt.days
             })
+            stage.rows_out = len(metrics)
+        
+        with tracer.stage('engagement.trend', len(activities)) as stage:
+            metrics['frequency_trend'] = self._calculate_trends(activities)
+            stage.rows_out = len(metrics)
+        
+        # Calculate average session length if available
+        if 'duration' in activities.columns:
+            metrics['avg_duration'] = grouped['duration'].mean()
+        else:
+            metrics['avg_duration'] = 0
+        
+        # Calculate total value if available
+        if 'value' in activities.columns:
+            metrics['total_value'] = grouped['value'].sum()
+        else:
+            metrics['total_value'] = 0
+        
+        return metrics
+    
+    def _engagement_from_aggregates(self, customers, aggregates, now=None):
+        """Build engagement metrics from running aggregates"""
+        if aggregates.total_activities == 0:
+            return self._empty_engagement(customers)
+        
+        return self._join_customers(customers, aggregates.metrics(now or self._reference_time()))
+    
+    def _activity_frame(self, activities, now=None, parser=None):
+        """Columns the engine uses plus a parsed 'date', leaving the caller's frame alone"""
+        columns = {
+            col: activities[col]
+            for col in ['customer_id', 'duration', 'value']
+            if col in activities.columns
+        }
         
         # Convert timestamp if needed
+        columns['date'] = self._activity_dates(activities, parser, now)
+        
+        return pd.DataFrame(columns, copy=False)
+    
+    def _activity_dates(self, activities, parser=None, now=None):
+        """Parse the activity date column (strings, datetimes or epoch numbers)"""
+        parser = parser or TimestampParser()
+        
         if 'timestamp' in activities.columns:
-            activities['date'] = pd.to_datetime(activities['timestamp'])
+            return parser.parse(activities['timestamp'])
         elif 'date' in activities.columns:
-            activities['date'] = pd.to_datetime(activities['date'])
+            return parser.parse(activities['date'])
         else:
             # Create dummy date
-            activities['date'] = datetime.now()
+            return pd.Series(now or self._reference_time(), index=activities.index)
+    
+    def _empty_engagement(self, customers):
+        """Engagement metrics when there are no activities at all"""
+        return pd.DataFrame({
+            'customer_id': customers['customer_id'],
+            'total_activities': 0,
+            'active_days': 0,
+            'recency_days': 999,
+            'frequency_trend': 'unknown'
+        })
+    
+    def _join_customers(self, customers, metrics):
+        """Left join per-customer metrics onto the customer list"""
         
-        # Calculate metrics per customer
-        results = []
+        # Customers without activity get the "inactive" defaults
+        results = pd.DataFrame({'customer_id': customers['customer_id'].unique()})
+        results = results.merge(
+            metrics.reset_index(), on='customer_id', how='left', indicator=True
+        )
+        inactive = results.pop('_merge') == 'left_only'
         
-        for cust_id in customers['customer_id'].unique():
-            cust_activities = activities[activities['customer_id'] == cust_id]
-            
-            if len(cust_activities) > 0:
-                # Calculate metrics
-                metrics = {
-                    'customer_id': cust_id,
-                    'total_activities': len(cust_activities),
-                    'active_days': cust_activities['date'].nunique(),
-                    'recency_days': (datetime.now() - cust_activities['date'].max()).days,
-                    'frequency_trend': self._calculate_trend(cust_activities)
-                }
-                
-                # Calculate average session length if available
-                if 'duration' in cust_activities.columns:
-                    metrics['avg_duration'] = cust_activities['duration'].mean()
-                else:
-                    metrics['avg_duration'] = 0
-                
-                # Calculate total value if available
-                if 'value' in cust_activities.columns:
-                    metrics['total_value'] = cust_activities['value'].sum()
-                else:
-                    metrics['total_value'] = 0
-            else:
-                # No activities
-                metrics = {
-                    'customer_id': cust_id,
-                    'total_activities': 0,
-                    'active_days': 0,
-                    'recency_days': 999,
-                    'frequency_trend': 'inactive',
-                    'avg_duration': 0,
-                    'total_value': 0
-                }
+        return self._fill_inactive(results, inactive, metrics.dtypes)
+    
+    def _fill_inactive(self, results, inactive, dtypes):
+        """Fill default metrics for customers with no activities"""
+        defaults = {
+            'total_activities': 0,
+            'active_days': 0,
+            'recency_days': 999,
+            'frequency_trend': 'inactive',
+            'avg_duration': 0,
+            'total_value': 0
+        }
+        
+        for col, default in defaults.items():
+            results[col] = results[col].where(~inactive, default)
             
-            results.append(metrics)
+            # The left join turns integer columns into floats, restore them
+            if results[col].dtype != dtypes[col] and results[col].notna().all():
+                results[col] = results[col].astype(dtypes[col])
         
-        return pd.DataFrame(results)
+        return results
     
     def _calculate_trend(self, activities):
         """Detect if engagement is increasing or decreasing"""
-        if len(activities) < 3:
+        if len(activities) < TREND_WINDOW:
             return 'stable'
         
-        # Sort by date
-        activities = activities.sort_values('date')
+        # Single customer, reuse the vectorized version
+        return self._calculate_trends(activities.assign(customer_id=0)).iloc[0]
+    
+    def _calculate_trends(self, activities, presorted=False):
+        """
+        Detect engagement trend for every customer in one sorted pass
+        
+        Compares the distinct dates among each customer's first 3 and last 3
+        activities. Pass presorted=True when each customer's activities are
+        already in date order to skip the sort.
+        """
+        if not presorted:
+            activities = activities.sort_values('date', kind='stable')
+        
+        grouped = activities.groupby('customer_id', sort=False)
+        counts = grouped.size()
+        
+        # Rows with a missing customer_id belong to no group
+        keep = activities['customer_id'].notna().to_numpy()
+        codes = grouped.ngroup().to_numpy()[keep].astype(np.intp)
+        position = grouped.cumcount().to_numpy()[keep].astype(np.intp)
+        size = counts.to_numpy()[codes]
+        
+        # A row adds a distinct date to its window when it is the first row
+        # of the window or its date differs from the customer's previous row
+        dates = activities['date']
+        valid = dates.notna().to_numpy()[keep]
+        changed = dates.ne(grouped['date'].shift()).to_numpy()[keep]
+        
+        tail_start = size - TREND_WINDOW
+        head = valid & (position < TREND_WINDOW) & (changed | (position == 0))
+        tail = valid & (position >= tail_start) & (changed | (position == tail_start))
         
         # Compare recent vs old
-        recent_count = activities.tail(3)['date'].nunique()
-        old_count = activities.head(3)['date'].nunique()
+        old_count = np.bincount(codes[head], minlength=len(counts))
+        recent_count = np.bincount(codes[tail], minlength=len(counts))
+        trends = trend_labels(counts.to_numpy(), old_count, recent_count)
         
-        if recent_count < old_count * 0.5:
-            return 'decreasing'
-        elif recent_count > old_count * 1.5:
-            return 'increasing'
-        else:
-            return 'stable'
+        return pd.Series(trends, index=counts.index, dtype=object)
     
-    def _assign_levels(self, df):
-        """Assign universal engagement levels"""
-        conditions = [
-            df['total_activities'] == 0,
-            df['total_activities'] == 1,
-            df['total_activities'] == 2,
-            df['total_activities'] <= 4,
-            df['total_activities'] <= 8,
-            df['total_activities'] > 8
-        ]
-        choices = [
-            'Never Active',
-            'Tried Once',
-            'Casual',
-            'Regular',
-            'Loyal',
-            'Super Customer'
-        ]
-        
-        df['engagement_level'] = np.select(conditions, choices, default='Unknown')
+    def _assign_levels(self, df, level_codes=None):
+        """Assign universal engagement levels (bins of the activity count)"""
+        if level_codes is None:
+            level_codes = self._plan().level_codes(df['total_activities'])
+        df['engagement_level'] = LEVEL_LABELS[level_codes]
         return df
     
-    def _calculate_risk(self, df):
+    def _calculate_risk(self, df, level_codes=None):
         """Calculate churn risk score 0-100"""
-        risk = 50  # Base risk
-        
-        # Risk by engagement level
-        level_risk = {
-            'Never Active': 95,
-            'Tried Once': 80,
-            'Casual': 60,
-            'Regular': 40,
-            'Loyal': 20,
-            'Super Customer': 10
-        }
+        plan = self._plan()
+        if level_codes is None:
+            level_codes = self._level_codes(df['engagement_level'])
         
-        risk = df['engagement_level'].map(level_risk).fillna(50)
+        # Risk by engagement level, plus recency and trend penalties, capped at 0-100
+        risk = plan.risk(level_codes, df['recency_days'], plan.trend_codes(df['frequency_trend']))
+        return pd.Series(risk, index=df.index)
+    
+    def _level_codes(self, levels):
+        """Convert engagement level names to codes (-1 = unknown)"""
+        return pd.Categorical(levels, categories=LEVELS).codes
+    
+    def _score_kernel(self, risk, level_codes):
+        """
+        Recommend actions and predict lifetime value for arrays of customers
         
-        # Add recency penalty
-        risk = risk + (df['recency_days'] * 0.5)
+        Parameters:
+        - risk: float array of churn risk scores
+        - level_codes: int array of engagement level codes (see LEVELS)
         
-        # Add trend penalty
-        trend_penalty = df['frequency_trend'].map({
-            'decreasing': 15,
-            'stable': 0,
-            'increasing': -10,
-            'inactive': 20,
-            'unknown': 0
-        }).fillna(0)
+        Returns:
+        - (action_codes, ltv) arrays, action codes index into ACTIONS
+        """
+        plan = self._plan()
+        
+        # Band n (above every threshold) = action 0, band 1 = action 3,
+        # band 0 = on track, or VIP for super customers
+        bands = plan.bands(risk)
+        on_track = np.where(level_codes == LEVELS.index('Super Customer'), 4, 5)
+        action_codes = np.where(bands > 0, len(plan.action_thresholds) - bands, on_track).astype(np.int8)
         
-        risk = risk + trend_penalty
+        # Unknown levels (code -1) pick up the trailing default value
+        base_value = plan.level_values[level_codes]
+        
+        # Adjust based on risk (higher risk = lower remaining value)
+        ltv = np.round(base_value * ((100 - risk) / 100), 2)
         
-        # Cap at 0-100
-        return np.clip(risk, 0, 100)
+        return action_codes, ltv
     
     def _recommend_action(self, customer):
         """Recommend what to do with this customer"""
-        
-        risk = customer['churn_risk']
-        level = customer['engagement_level']
-        
-        if risk > 85:
-            return "🚨 URGENT: Personal phone call + 30% discount"
-        elif risk > 70:
-            return "⚠️ HIGH: Send personal email from CEO + 20% off"
-        elif risk > 50:
-            return "📧 MEDIUM: Re-engagement campaign with new features"
-        elif risk > 30:
-            return "📱 LOW: Regular newsletter + product recommendations"
-        elif level == 'Super Customer':
-            return "🌟 VIP: Ask for referral + early access to new products"
-        else:
-            return "✅ ON TRACK: Continue regular engagement"
+        action_codes, _ = self._score_kernel(
+            np.array([customer['churn_risk']], dtype=np.float64),
+            self._level_codes([customer['engagement_level']])
+        )
+        return ACTIONS[action_codes[0]]
     
     def _predict_ltv(self, customer):
         """Predict customer lifetime value"""
-        level = customer['engagement_level']
-        
-        # Default values by level
-        level_values = {
-            'Never Active': 0,
-            'Tried Once': 160,
-            'Casual': 250,
-            'Regular': 390,
-            'Loyal': 510,
-            'Super Customer': 630
-        }
+        _, ltv = self._score_kernel(
+            np.array([customer['churn_risk']], dtype=np.float64),
+            self._level_codes([customer['engagement_level']])
+        )
+        return ltv[0]
+    
+    def get_summary_stats(self, analysis):
+        """
+        Generate summary statistics for business users
         
-        base_value = level_values.get(level, 100)
+        analysis is analyze_customers results or an iterable of result
+        chunks. Each chunk is summarized in one pass without copying rows.
+        """
+        if isinstance(analysis, pd.DataFrame):
+            analysis = [analysis]
         
-        # Adjust based on risk (higher risk = lower remaining value)
-        risk_factor = (100 - customer['churn_risk']) / 100
+        summary = SummaryStats(LEVELS)
+        for chunk in analysis:
+            summary.merge(self.summarize(chunk))
         
-        return round(base_value * risk_factor, 2)
+        return summary.as_dict()
+    
+    def summarize(self, analysis_df):
+        """Partial SummaryStats for some results, merge parts with SummaryStats.merge"""
+        level_codes = self._level_codes(analysis_df['engagement_level'])
+        return SummaryStats(LEVELS).add(analysis_df, level_codes)
     
-    def get_summary_stats(self, analysis_df):
-        """Generate summary statistics for business users"""
+    def top_at_risk(self, analysis, k=100, by='churn_risk', tie_break='predicted_ltv', above=None):
+        """
+        The k customers most at risk, without sorting every customer
         
-        stats = {
-            'total_customers': len(analysis_df),
-            'at_risk_customers': len(analysis_df[analysis_df['churn_risk'] > 70]),
-            'urgent_customers': len(analysis_df[analysis_df['urgent']]),
-            'avg_risk': analysis_df['churn_risk'].mean(),
-            'total_predicted_value': analysis_df['predicted_ltv'].sum(),
-            'engagement_breakdown': analysis_df['engagement_level'].value_counts().to_dict()
-        }
+        Parameters:
+        - analysis: analyze_customers results, or an iterable of result
+          chunks (only k rows are kept between chunks)
+        - k: number of customers to return
+        - by: score to rank on, highest first
+        - tie_break: column ranking customers with the same score
+        - above: only consider customers with `by` above this (e.g. 70)
         
-        # Calculate potential savings
-        stats['potential_savings'] = round(
-            stats['at_risk_customers'] * 160 * 0.3,  # 30% of one-time buyer value
-            2
-        )
+        Returns:
+        - The top k rows, best first, ordered as a stable sort on
+          [by, tie_break] descending would order them
+        """
+        if isinstance(analysis, pd.DataFrame):
+            return top_k(analysis, k, by, tie_break, above)
         
-        return stats
+        top = TopK(k, by, tie_break, above)
+        for chunk in analysis:
+            top.add(chunk)
+        return top.result()
     
-    def export_for_crm(self, analysis_df, output_path='exports/crm_upload.csv'):
-        """Export in format CRM systems can import"""
+    def crossing_index(self, analysis_df, as_of=None):
+        """
+        Index of the days customers cross action thresholds
         
-        export_df = analysis_df[[
-            'customer_id', 
-            'engagement_level', 
-            'churn_risk', 
-            'recommended_action',
-            'urgent'
-        ]].copy()
+        Parameters:
+        - analysis_df: analyze_customers results (modified in place as the
+          index advances)
+        - as_of: reference time the results were scored at (default:
+          analysis_df.attrs['as_of'])
         
-        # Create CRM-friendly format
-        export_df['status'] = export_df.apply(
-            lambda x: 'URGENT' if x['urgent'] else x['engagement_level'],
-            axis=1
-        )
+        Returns:
+        - CrossingIndex, call advance_to(date) to get the customers whose
+          recommended action changes by then
+        """
+        return CrossingIndex(self, analysis_df, self._plan(), ACTIONS, as_of)
+    
+    def feature_index(self, aggregates, customers=None, as_of=None):
+        """
+        In-memory index of engagement features for scoring single customers
         
-        export_df['next_action_date'] = datetime.now() + timedelta(days=1)
-        export_df['campaign'] = export_df['recommended_action'].apply(
-            lambda x: x.split(':')[0] if ':' in x else 'General'
-        )
+        Parameters:
+        - aggregates: EngagementAggregates, e.g. EngagementStateStore.aggregates
+        - customers: DataFrame with 'customer_id' (default: every customer
+          in the aggregates)
+        - as_of: reference time the features are built at (default: now)
+        
+        Returns:
+        - FeatureIndex, score(customer_id) gives the same scores as
+          analyze_customers on the full history
+        """
+        return FeatureIndex(self, aggregates, LEVEL_LABELS, ACTIONS, customers, as_of)
+    
+    def export_for_crm(self, analysis_df, output_path='exports/crm_upload.csv', as_of=None,
+                       compression='infer', max_rows=None, chunksize=100_000, snapshot_path=None):
+        """
+        Export in format CRM systems can import
+        
+        Parameters:
+        - analysis_df: analyze_customers results
+        - output_path: .csv, .csv.gz, .csv.zst or .parquet file
+        - as_of: the next action is scheduled one day after this (default: now)
+        - compression: CSV compression ('gzip', 'zstd', None, ...), by
+          default taken from the file extension
+        - max_rows: split into files of at most this many rows for CRM
+          upload limits (crm_upload_part001.csv, ...), parts left over
+          from an earlier bigger export are deleted
+        - chunksize: rows written at a time
+        - snapshot_path: export only what changed since the last export
+          with this snapshot file, see below
+        
+        Returns:
+        - The exported DataFrame. Files are written to a temporary
+          directory and moved into place once all are complete, so a
+          crash never leaves half a file.
+        
+        With snapshot_path, only customers whose status or campaign changed
+        are exported, with a 'change' column: 'insert', 'update' or
+        'delete' (removed customers, customer_id only). The snapshot is
+        updated after the files are written.
+        """
+        export_df = crm_frame(analysis_df, self._reference_time(as_of) + timedelta(days=1))
+        
+        if snapshot_path is not None:
+            snapshot = ExportSnapshot(snapshot_path)
+            export_df, current = snapshot.delta(export_df)
         
         # Save
-        os.makedirs('exports', exist_ok=True)
-        export_df.to_csv(output_path, index=False)
-        print(f"✅ CRM export saved to {output_path}")
+        paths = write_export(export_df, output_path, compression, chunksize, max_rows)
+        self._log("✅ CRM export saved to %s", ', '.join(paths))
+        
+        if snapshot_path is not None:
+            snapshot.save(current)
+            self._log("   %d of %d customers changed", len(export_df), len(current))
         
         return export_df
 
@@ -0,0 +1,218 @@
+"""
+HumanChurnML - CRM Export
+Build the CRM upload table and write it in chunks, compressed or as Parquet
+"""
+
+import os
+import re
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from src.production.readers import _is_parquet
+
+# Columns taken over from the analysis results, in upload order
+EXPORT_COLUMNS = ['customer_id', 'engagement_level', 'churn_risk', 'recommended_action', 'urgent']
+
+# Columns whose change makes a customer part of a delta export
+FINGERPRINT_COLUMNS = ['status', 'campaign']
+
+
+def _per_unique(values, func):
+    """Apply func to each distinct value only, then spread the results back"""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    mapped = np.array([func(value) for value in uniques] + [None], dtype=object)
+    return mapped[codes]
+
+
+def _campaign(action):
+    """Campaign name from a recommended action ('🚨 URGENT: ...' -> '🚨 URGENT')"""
+    return action.split(':')[0] if ':' in action else 'General'
+
+
+def crm_frame(analysis_df, next_action_date):
+    """
+    The CRM upload table for some analysis results
+    
+    status and campaign are derived per distinct value (a handful of
+    levels and actions) instead of row by row. The result columns are
+    shared with analysis_df where possible, not copied.
+    """
+    columns = {col: analysis_df[col] for col in EXPORT_COLUMNS}
+    export_df = pd.DataFrame(columns, copy=False)
+    
+    urgent = analysis_df['urgent'].to_numpy(dtype=bool)
+    levels = np.asarray(analysis_df['engagement_level'], dtype=object)
+    export_df['status'] = np.where(urgent, 'URGENT', levels)
+    
+    export_df['next_action_date'] = pd.Timestamp(next_action_date)
+    export_df['campaign'] = _per_unique(analysis_df['recommended_action'], _campaign)
+    
+    return export_df
+
+
+def _parquet():
+    """pyarrow is only needed for Parquet exports"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet exports require pyarrow: pip install pyarrow")
+    return pa, pq
+
+
+def part_paths(output_path, n_parts):
+    """File names for an export split into n_parts (crm.csv -> crm_part001.csv, ...)"""
+    if n_parts == 1:
+        return [output_path]
+    
+    # Keep compound extensions like .csv.gz after the part number
+    directory, name = os.path.split(output_path)
+    stem, dot, extension = name.partition('.')
+    return [
+        os.path.join(directory, f"{stem}_part{i:03d}{dot}{extension}")
+        for i in range(1, n_parts + 1)
+    ]
+
+
+def existing_parts(output_path):
+    """Files of an earlier export to output_path on disk, whole or split into parts"""
+    directory, name = os.path.split(output_path)
+    stem, dot, extension = name.partition('.')
+    pattern = re.compile(rf"{re.escape(stem)}_part\d{{3,}}{re.escape(dot + extension)}")
+    return [
+        os.path.join(directory, entry)
+        for entry in os.listdir(directory or '.')
+        if entry == name or pattern.fullmatch(entry)
+    ]
+
+
+def write_export(export_df, output_path, compression='infer', chunksize=100_000, max_rows=None):
+    """
+    Write an export table, never leaving a half-written file behind
+    
+    Parameters:
+    - export_df: table to write
+    - output_path: .csv (optionally .csv.gz / .csv.zst) or .parquet file
+    - compression: CSV compression ('gzip', 'zstd', None, ...), by
+      default inferred by pandas from the file extension
+    - chunksize: rows formatted and written at a time
+    - max_rows: split into several files of at most this many rows
+    
+    Returns:
+    - List of written file paths
+    
+    All files are written to a temporary directory next to output_path
+    and moved into place once every one is complete. Files of an earlier
+    export to the same path that this one doesn't replace (e.g. the
+    crm_part004.csv of a bigger run) are deleted after the move.
+    """
+    directory = os.path.dirname(output_path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    
+    n_rows = len(export_df)
+    rows_per_file = max_rows or max(n_rows, 1)
+    n_parts = max(1, -(-n_rows // rows_per_file))
+    paths = part_paths(output_path, n_parts)
+    
+    with tempfile.TemporaryDirectory(dir=directory, prefix='.churn_export_') as tmp_dir:
+        # Same file names in the temporary directory, so compression
+        # inference sees the real extension
+        tmp_paths = [os.path.join(tmp_dir, os.path.basename(path)) for path in paths]
+        
+        for i, tmp_path in enumerate(tmp_paths):
+            part = export_df.iloc[i * rows_per_file:(i + 1) * rows_per_file]
+            if _is_parquet(tmp_path):
+                _write_parquet(part, tmp_path, chunksize)
+            else:
+                part.to_csv(tmp_path, index=False, chunksize=chunksize, compression=compression)
+        
+        stale = set(existing_parts(output_path)) - set(paths)
+        for tmp_path, path in zip(tmp_paths, paths):
+            os.replace(tmp_path, path)
+    
+    for path in stale:
+        os.remove(path)
+    
+    return paths
+
+
+def _write_parquet(export_df, path, chunksize):
+    """Write a Parquet file one row group per chunk"""
+    pa, pq = _parquet()
+    
+    # Types come from the first chunk, an empty slice has no types to infer
+    schema = pa.Schema.from_pandas(export_df.iloc[:chunksize], preserve_index=False)
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        for start in range(0, max(len(export_df), 1), chunksize):
+            chunk = export_df.iloc[start:start + chunksize]
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def fingerprints(export_df):
+    """64-bit hash of each row's FINGERPRINT_COLUMNS, indexed by customer_id"""
+    hashes = pd.util.hash_pandas_object(export_df[FINGERPRINT_COLUMNS], index=False)
+    return pd.Series(hashes.to_numpy(), index=pd.Index(export_df['customer_id']))
+
+
+class ExportSnapshot:
+    """
+    Fingerprints of what the last export sent to the CRM
+    
+    Keeps one 64-bit hash of status and campaign per customer_id on disk,
+    so the next export can send only what changed: new customers
+    ('insert'), customers whose status or campaign moved ('update') and
+    customers that are gone ('delete').
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self.fingerprints = self._load()
+    
+    def _load(self):
+        """Load the saved fingerprints, or start empty"""
+        if os.path.exists(self.path):
+            return pd.read_pickle(self.path)
+        return pd.Series([], index=pd.Index([], dtype=object), dtype=np.uint64)
+    
+    def save(self, fingerprints):
+        """Replace the snapshot (write then rename, never half-written)"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        
+        tmp_path = f"{self.path}.tmp"
+        pd.to_pickle(fingerprints, tmp_path)
+        os.replace(tmp_path, self.path)
+        self.fingerprints = fingerprints
+    
+    def delta(self, export_df):
+        """
+        Rows of export_df that changed since the snapshot, plus deletions
+        
+        Returns:
+        - (delta DataFrame with a 'change' column, new fingerprints to
+          save once the delta has been delivered)
+        """
+        current = fingerprints(export_df)
+        previous = self.fingerprints
+        
+        # Position of every current customer in the snapshot (-1 = new)
+        position = previous.index.get_indexer(current.index)
+        inserted = position < 0
+        known = ~inserted
+        
+        updated = np.zeros(len(current), dtype=bool)
+        updated[known] = previous.to_numpy()[position[known]] != current.to_numpy()[known]
+        
+        seen = np.zeros(len(previous), dtype=bool)
+        seen[position[known]] = True
+        
+        changed = inserted | updated
+        delta = export_df[changed].copy()
+        delta['change'] = np.where(inserted[changed], 'insert', 'update')
+        
+        deleted = pd.DataFrame({'customer_id': previous.index[~seen], 'change': 'delete'})
+        if len(deleted) > 0:
+            delta = pd.concat([delta, deleted], ignore_index=True)
+        
+        return delta, current
@@ -0,0 +1,128 @@
+"""
+HumanChurnML - Threshold Crossing Index
+Rescore only the customers whose action band changes as days pass
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class CrossingIndex:
+    """
+    When each customer's churn risk crosses an action threshold
+    
+    Without new activity, time only moves risk through recency: every day
+    adds recency_weight to the unclipped risk, churn_risk is that clipped
+    to 0-100. The days on which a customer crosses each action threshold
+    are therefore known in advance. They are computed once and sorted, so
+    advance_to() finds the customers whose band changes with one
+    searchsorted and rescores only them.
+    
+    Only recommended_action and urgent are kept current for every
+    customer. recency_days, churn_risk and predicted_ltv are refreshed for
+    the customers advance_to() returns, the rest still show as_of values.
+    """
+    
+    def __init__(self, engine, results, plan, actions, as_of=None):
+        self.engine = engine
+        self.results = results
+        self.plan = plan
+        self.actions = np.asarray(actions, dtype=object)
+        self.as_of = pd.Timestamp(as_of if as_of is not None else results.attrs['as_of'])
+        self.day = 0
+        
+        # Scoring inputs at as_of, rescoring always starts from these
+        self._level_codes = plan.level_codes(results['total_activities'])
+        self._trend_codes = plan.trend_codes(results['frequency_trend'])
+        self._recency = results['recency_days'].to_numpy(dtype=np.float64, copy=True)
+        
+        # Unclipped: a risk below 0 takes days to reach 0 before it shows
+        risk = plan.raw_risk(self._level_codes, self._recency, self._trend_codes)
+        
+        # Customers without activity keep their fixed recency, time can't
+        # move them, nor anyone whose risk doesn't grow
+        moving = (results['total_activities'].to_numpy() > 0) & ~np.isnan(risk) & (risk < 100)
+        if plan.recency_weight <= 0:
+            moving[:] = False
+        
+        # First whole day with risk above each threshold
+        customers, days = [], []
+        for threshold in plan.action_thresholds:
+            pending = np.flatnonzero(moving & (risk <= threshold))
+            customers.append(pending)
+            days.append(self._crossing_day(pending, risk[pending], threshold))
+        
+        customers = np.concatenate(customers)
+        days = np.concatenate(days)
+        order = np.argsort(days, kind='stable')
+        
+        self.customers = customers[order]
+        self.days = days[order]
+        self._next = 0
+    
+    def _raw_risk(self, positions, day):
+        """Unclipped risk of some customers day days after as_of, as analyze_customers sums it"""
+        return self.plan.raw_risk(self._level_codes[positions], self._recency[positions] + day,
+                                  self._trend_codes[positions])
+    
+    def _crossing_day(self, positions, risk, threshold):
+        """First whole day d with the risk of positions above threshold (risk: at day 0)"""
+        day = np.floor((threshold - risk) / self.plan.recency_weight).astype(np.int64) + 1
+        
+        # The division can round either way, settle on the exact day with
+        # the same sum _rescore computes
+        def above(days):
+            return self._raw_risk(positions, days) > threshold
+        
+        late = (day > 1) & above(day - 1)
+        early = ~above(day)
+        while late.any() or early.any():
+            day[late] -= 1
+            day[early] += 1
+            late = (day > 1) & above(day - 1)
+            early = ~above(day)
+        return day
+    
+    def next_crossing(self):
+        """Date of the next band change, or None if no customer has one left"""
+        if self._next >= len(self.days):
+            return None
+        return self.as_of + pd.Timedelta(days=int(self.days[self._next]))
+    
+    def advance_to(self, date):
+        """
+        Move the index to date and rescore the customers whose band changed
+        
+        Returns:
+        - The rescored rows of those customers (recency, risk, action, LTV
+          and urgent flag as of date)
+        """
+        day = (pd.Timestamp(date) - self.as_of).days
+        if day < self.day:
+            raise ValueError(f"Can't move back from {self.as_of + pd.Timedelta(days=self.day)} to {date}")
+        
+        end = np.searchsorted(self.days, day, side='right')
+        changed = np.unique(self.customers[self._next:end])
+        self._next = end
+        self.day = day
+        
+        return self._rescore(changed, day)
+    
+    def _rescore(self, positions, day):
+        """Score some customers (row positions) day days after as_of"""
+        results = self.results
+        
+        risk = np.clip(self._raw_risk(positions, day), 0, 100)
+        action_codes, ltv = self.engine._score_kernel(risk, self._level_codes[positions])
+        
+        updates = {
+            'recency_days': (self._recency[positions] + day).astype(results['recency_days'].dtype),
+            'churn_risk': risk,
+            'recommended_action': self.actions[action_codes],
+            'predicted_ltv': ltv,
+            'urgent': risk > 70
+        }
+        for column, values in updates.items():
+            results.iloc[positions, results.columns.get_loc(column)] = values
+        
+        return results.iloc[positions]
@@ -0,0 +1,187 @@
+"""
+HumanChurnML - Feature Index
+Per-customer engagement features in memory for single-customer scoring
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.production.state_store import EngagementStateStore
+
+NS_PER_DAY = 86_400 * 10**9
+
+# Engagement columns served as stored, the rest is scored per lookup
+FEATURE_COLUMNS = ['total_activities', 'active_days', 'frequency_trend', 'avg_duration', 'total_value']
+
+
+def _python(values):
+    """Array to a list of plain Python values, NaN as None"""
+    values = values.tolist()
+    return [None if isinstance(v, float) and v != v else v for v in values]
+
+
+class FeatureIndex:
+    """
+    Engagement features of every customer, looked up by customer_id
+    
+    Built once from running aggregates and never changed afterwards, a
+    refresh builds a new index and swaps it in. Scoring is a hash lookup
+    plus the engine's own risk and action kernels on the gathered rows, no
+    DataFrame is built per request. Recency comes from each customer's
+    last activity date at lookup time, so scores stay current between
+    refreshes.
+    
+    customer_ids are matched as strings, so ids from a URL find integer ids.
+    """
+    
+    def __init__(self, engine, aggregates, level_labels, actions, customers=None, as_of=None):
+        self.engine = engine
+        self.level_labels = np.asarray(level_labels, dtype=object)
+        self.actions = np.asarray(actions, dtype=object)
+        self.as_of = engine._reference_time(as_of)
+        
+        if customers is None:
+            customers = pd.DataFrame({'customer_id': aggregates.customer_ids()})
+        engagement = engine._engagement_from_aggregates(customers, aggregates, self.as_of)
+        ids = engagement['customer_id']
+        
+        self.customer_ids = ids.to_numpy(dtype=object)
+        self.index = pd.Index(ids.astype(str))
+        
+        plan = engine._plan()
+        self.level_codes = plan.level_codes(engagement['total_activities'])
+        self.trend_codes = plan.trend_codes(engagement['frequency_trend'])
+        self.features = {col: engagement[col].to_numpy() for col in FEATURE_COLUMNS if col in engagement}
+        
+        # Recency at as_of, kept for customers without a dated activity
+        self.recency_days = engagement['recency_days'].to_numpy(dtype=np.float64)
+        
+        if aggregates.total_activities > 0:
+            last = aggregates.last_activity().reindex(ids).to_numpy(dtype='datetime64[ns]')
+        else:
+            last = np.full(len(ids), np.datetime64('NaT'), dtype='datetime64[ns]')
+        self.dated = ~np.isnat(last)
+        self.last_activity = last.view(np.int64)
+    
+    def __len__(self):
+        return len(self.customer_ids)
+    
+    def score(self, customer_id, as_of=None):
+        """Scores of one customer as a dict, None if the index doesn't know them"""
+        try:
+            position = self.index.get_loc(str(customer_id))
+        except KeyError:
+            return None
+        return self._score(np.array([position]), as_of)[0]
+    
+    def score_many(self, customer_ids, as_of=None):
+        """
+        Scores of several customers
+        
+        Returns:
+        - (list of score dicts in request order, ids the index doesn't know)
+        """
+        positions = self.index.get_indexer([str(cid) for cid in customer_ids])
+        found = positions >= 0
+        missing = [cid for cid, ok in zip(customer_ids, found) if not ok]
+        return self._score(positions[found], as_of), missing
+    
+    def _score(self, positions, as_of=None):
+        """Score rows of the index at as_of (default: now), the same as analyze_customers"""
+        now = pd.Timestamp(self.engine._reference_time(as_of)).value
+        
+        recency = self.recency_days[positions]
+        dated = self.dated[positions]
+        recency[dated] = (now - self.last_activity[positions[dated]]) // NS_PER_DAY
+        
+        level_codes = self.level_codes[positions]
+        risk = self.engine._plan().risk(level_codes, recency, self.trend_codes[positions])
+        action_codes, ltv = self.engine._score_kernel(risk, level_codes)
+        
+        columns = {
+            'customer_id': self.customer_ids[positions],
+            **{col: values[positions] for col, values in self.features.items()},
+            # Whole days as integers, like analyze_customers
+            'recency_days': [None if days is None else int(days) for days in _python(recency)],
+            'engagement_level': self.level_labels[level_codes],
+            'churn_risk': risk,
+            'recommended_action': self.actions[action_codes],
+            'predicted_ltv': ltv,
+            'urgent': risk > 70
+        }
+        
+        names = list(columns)
+        values = [v if isinstance(v, list) else _python(v) for v in columns.values()]
+        return [dict(zip(names, row)) for row in zip(*values)]
+
+
+class FeatureIndexLoader:
+    """
+    Keeps a FeatureIndex in step with an engagement state file
+    
+    The state file is the one EngagementStateStore saves (e.g. after a
+    daily update()). Creating a loader reads nothing, the first current()
+    loads the file in the foreground. After that current() checks its
+    modification time at most every check_interval seconds. A changed
+    file is loaded into a new index in a
+    background thread while lookups keep using the old one, then the new
+    index replaces it in a single assignment.
+    """
+    
+    def __init__(self, engine, state_path, check_interval=30):
+        self.engine = engine
+        self.state_path = state_path
+        self.check_interval = check_interval
+        self.index = None
+        
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._mtime = None
+        self._checked = 0.0
+    
+    def _state_mtime(self):
+        """Modification time of the state file, None if there is none yet"""
+        try:
+            return os.stat(self.state_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+    
+    def current(self):
+        """The latest index (None until a state file exists)"""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._checked = time.monotonic()
+                    self._refresh(self._state_mtime())
+                    self._loaded = True
+            return self.index
+        
+        if time.monotonic() - self._checked >= self.check_interval and self._lock.acquire(blocking=False):
+            self._checked = time.monotonic()
+            mtime = self._state_mtime()
+            if mtime != self._mtime:
+                threading.Thread(target=self._refresh, args=(mtime, True), daemon=True).start()
+            else:
+                self._lock.release()
+        return self.index
+    
+    def _refresh(self, mtime, locked=False):
+        """Build an index from the state file and swap it in"""
+        try:
+            if mtime is None:
+                self.index = None
+            else:
+                store = EngagementStateStore(self.state_path, self.engine)
+                self.index = self.engine.feature_index(store.aggregates)
+                self.engine._log("✅ Feature index loaded with %d customers", len(self.index))
+            self._mtime = mtime
+        except Exception as e:
+            # Keep serving the previous index, retry at the next check
+            self.engine._log("⚠️  Feature index refresh failed: %s", e)
+        finally:
+            if locked:
+                self._lock.release()
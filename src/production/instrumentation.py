@@ -0,0 +1,80 @@
+"""
+HumanChurnML - Instrumentation
+Stage timing and tracing hooks for the engine
+"""
+
+import os
+import resource
+import sys
+import time
+from collections import namedtuple
+
+# One finished stage: wall time, rows in/out and change in resident memory
+StageRecord = namedtuple('StageRecord', ['name', 'seconds', 'rows_in', 'rows_out', 'memory_delta'])
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def current_rss():
+    """Resident memory of this process in bytes"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        # No /proc (macOS, Windows), fall back to the peak
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class _Stage:
+    """A running stage, set rows_out before it finishes"""
+    
+    def __init__(self, tracer, name, rows_in):
+        self.tracer = tracer
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+    
+    def __enter__(self):
+        self._rss = current_rss()
+        self._start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self._start
+        record = StageRecord(
+            name=self.name,
+            seconds=seconds,
+            rows_in=self.rows_in,
+            rows_out=self.rows_out,
+            memory_delta=current_rss() - self._rss
+        )
+        self.tracer.finish(record)
+        return False
+
+
+class StageTracer:
+    """
+    Records every stage of one engine run
+    
+    Each finished stage is kept in records and passed to every hook, a
+    callable taking a StageRecord. Stages inside stages are named with a
+    dot ('engagement.trend') and finish before their parent.
+    """
+    
+    def __init__(self, hooks=()):
+        self.hooks = list(hooks)
+        self.records = []
+    
+    def stage(self, name, rows_in=None):
+        """Context manager timing one stage"""
+        return _Stage(self, name, rows_in)
+    
+    def finish(self, record):
+        self.records.append(record)
+        for hook in self.hooks:
+            hook(record)
+    
+    def as_dicts(self):
+        """Records as plain dicts, for result metadata and JSON"""
+        return [record._asdict() for record in self.records]
@@ -0,0 +1,416 @@
+"""
+HumanChurnML - Analysis Jobs
+Run large analyses in background worker processes, queued in SQLite
+"""
+
+import contextlib
+import functools
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+# Top-level stages of analyze_customers, in order, for progress reporting
+PROGRESS_STAGES = ['engagement', 'levels', 'risk', 'actions_ltv', 'urgent']
+
+# Job workers run at lower CPU priority than the request handlers
+JOB_NICENESS = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    stage TEXT,
+    error TEXT,
+    pid INTEGER,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    total_results INTEGER,
+    pages INTEGER,
+    summary TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created);
+CREATE TABLE IF NOT EXISTS pages (
+    job_id TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    rows TEXT NOT NULL,
+    PRIMARY KEY (job_id, page)
+);
+"""
+
+
+class QueueFull(Exception):
+    """The job queue already holds max_pending waiting jobs"""
+
+
+def _connect(db_path):
+    """New connection, transactions are opened explicitly"""
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+@contextlib.contextmanager
+def _transaction(db_path):
+    """Write transaction, holding SQLite's write lock from the start"""
+    conn = _connect(db_path)
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+    except BaseException:
+        conn.close()
+        raise
+    try:
+        yield conn
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+
+
+def _input_dir(db_path):
+    """Directory of the input files next to the queue database"""
+    return os.path.join(os.path.dirname(db_path) or '.', 'inputs')
+
+
+def _input_path(db_path, job_id):
+    """Where a job's input frames wait until a worker picks it up"""
+    return os.path.join(_input_dir(db_path), f'{job_id}.pkl')
+
+
+_worker_engine = None
+
+
+def _init_worker(engine):
+    """Worker process setup: lower priority, one engine per process"""
+    global _worker_engine
+    if hasattr(os, 'nice'):
+        os.nice(JOB_NICENESS)
+    _worker_engine = engine
+
+
+def _run_job(db_path, job_id, page_size):
+    """Worker: analyze one job's input and store the results page by page"""
+    engine = _worker_engine
+    
+    def report(record):
+        if record.name in PROGRESS_STAGES:
+            done = PROGRESS_STAGES.index(record.name) + 1
+            with _transaction(db_path) as conn:
+                conn.execute('UPDATE jobs SET progress = ?, stage = ? WHERE id = ?',
+                             (done / (len(PROGRESS_STAGES) + 1), record.name, job_id))
+    
+    input_path = _input_path(db_path, job_id)
+    try:
+        with _transaction(db_path) as conn:
+            conn.execute('UPDATE jobs SET pid = ? WHERE id = ?', (os.getpid(), job_id))
+        
+        customers, activities = pd.read_pickle(input_path)
+        engine.stage_hooks = [report]
+        results = engine.analyze_customers(customers, activities)
+        summary = engine.get_summary_stats(results)
+        
+        pages = max(1, -(-len(results) // page_size))
+        rows = [
+            (job_id, page + 1, results.iloc[page * page_size:(page + 1) * page_size]
+             .to_json(orient='records', date_format='iso'))
+            for page in range(pages)
+        ]
+        with _transaction(db_path) as conn:
+            conn.executemany('INSERT INTO pages (job_id, page, rows) VALUES (?, ?, ?)', rows)
+            conn.execute(
+                "UPDATE jobs SET status = 'done', progress = 1, stage = NULL, finished = ?, "
+                "total_results = ?, pages = ?, summary = ? WHERE id = ?",
+                (time.time(), len(results), pages, json.dumps(summary), job_id)
+            )
+    except Exception as e:
+        _fail(db_path, job_id, str(e))
+    finally:
+        engine.stage_hooks = []
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(input_path)
+
+
+def _fail(db_path, job_id, error):
+    """Mark a job failed, unless it already finished"""
+    with _transaction(db_path) as conn:
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', error = ?, finished = ? "
+            "WHERE id = ? AND status IN ('queued', 'running')",
+            (error, time.time(), job_id)
+        )
+
+
+def _requeue(db_path, job_id):
+    """Put a claimed job back in the queue, in its old place"""
+    with _transaction(db_path) as conn:
+        conn.execute(
+            "UPDATE jobs SET status = 'queued', started = NULL, pid = NULL "
+            "WHERE id = ? AND status = 'running'",
+            (job_id,)
+        )
+
+
+def _process_alive(pid):
+    """True if a process with this pid still exists on this machine"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    """
+    Bounded queue of analyze_customers jobs
+    
+    Jobs and their paged results live in one SQLite file, inputs in
+    pickle files next to it, so there is no broker to run and every API
+    process on the machine shares the same queue. Each process starts its
+    dispatcher on first use (after any fork). Dispatchers claim jobs in a
+    write transaction that checks the number running, so at most
+    max_running jobs run at once across all of them. Jobs run in worker
+    processes at lower priority, leaving the request handlers responsive.
+    
+    Every API process (e.g. each gunicorn worker) has its own pool of up
+    to max_running worker processes, started when it hands out a job and
+    stopped after pool_idle_seconds without one. A worker that dies (e.g.
+    OOM killed) fails the jobs of its pool, the next job gets a new pool.
+    """
+    
+    def __init__(self, engine, db_path='jobs/jobs.db', max_running=2, max_pending=20,
+                 page_size=1000, poll_interval=0.5, keep_seconds=24 * 3600, pool_idle_seconds=60):
+        """
+        Parameters:
+        - engine: ChurnEngine the workers analyze with
+        - db_path: SQLite file of the queue (created on first use)
+        - max_running: jobs analyzed at the same time
+        - max_pending: waiting jobs before submit() raises QueueFull
+        - page_size: results per page
+        - poll_interval: seconds between queue checks when idle
+        - keep_seconds: how long finished jobs and their results are kept
+        - pool_idle_seconds: how long this process's worker processes
+          stay up without a job
+        """
+        self.engine = engine
+        self.db_path = db_path
+        self.max_running = max_running
+        self.max_pending = max_pending
+        self.page_size = page_size
+        self.poll_interval = poll_interval
+        self.keep_seconds = keep_seconds
+        self.pool_idle_seconds = pool_idle_seconds
+        
+        self._lock = threading.Lock()
+        self._pid = None
+        self._pool = None
+        self._active = 0
+        self._idle_since = time.monotonic()
+    
+    def _ensure_started(self):
+        """Create the queue files, start this process's dispatcher thread once"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            
+            # Nothing touches the disk until the queue is used, importing
+            # the API (e.g. in a spawned worker) creates no files
+            os.makedirs(_input_dir(self.db_path), exist_ok=True)
+            conn = _connect(self.db_path)
+            try:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.executescript(SCHEMA)
+            finally:
+                conn.close()
+            
+            self._pid = os.getpid()
+            self._pool = None
+            self._active = 0
+            threading.Thread(target=self._dispatch, name='churn-jobs', daemon=True).start()
+    
+    def submit(self, customer_data, activity_data):
+        """
+        Queue an analysis
+        
+        Returns:
+        - Job id for status() and page()
+        
+        Raises QueueFull when max_pending jobs are already waiting.
+        """
+        self._ensure_started()
+        job_id = uuid.uuid4().hex
+        
+        # Input goes to disk first, a worker never sees a job without it
+        input_path = _input_path(self.db_path, job_id)
+        tmp_path = f"{input_path}.tmp"
+        pd.to_pickle((customer_data, activity_data), tmp_path)
+        os.replace(tmp_path, input_path)
+        
+        try:
+            with _transaction(self.db_path) as conn:
+                pending = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+                if pending >= self.max_pending:
+                    raise QueueFull(f"{pending} jobs already waiting, try again later")
+                conn.execute("INSERT INTO jobs (id, status, created) VALUES (?, 'queued', ?)",
+                             (job_id, time.time()))
+        except BaseException:
+            os.remove(input_path)
+            raise
+        
+        return job_id
+    
+    def status(self, job_id):
+        """Job status and progress as a dict, None for an unknown id"""
+        self._ensure_started()
+        conn = _connect(self.db_path)
+        try:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if row is None:
+                return None
+            position = None
+            if row['status'] == 'queued':
+                position = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created <= ?",
+                    (row['created'],)
+                ).fetchone()[0]
+        finally:
+            conn.close()
+        
+        def when(seconds):
+            return pd.Timestamp.fromtimestamp(seconds).isoformat() if seconds else None
+        
+        return {
+            'job_id': row['id'],
+            'status': row['status'],
+            'progress': round(row['progress'], 3),
+            'stage': row['stage'],
+            'queue_position': position,
+            'created': when(row['created']),
+            'started': when(row['started']),
+            'finished': when(row['finished']),
+            'error': row['error'],
+            'total_results': row['total_results'],
+            'pages': row['pages'],
+            'page_size': self.page_size,
+            'summary': json.loads(row['summary']) if row['summary'] else None
+        }
+    
+    def page(self, job_id, page):
+        """One page of results as a JSON array of records (pages start at 1), or None"""
+        self._ensure_started()
+        conn = _connect(self.db_path)
+        try:
+            row = conn.execute('SELECT rows FROM pages WHERE job_id = ? AND page = ?',
+                               (job_id, page)).fetchone()
+        finally:
+            conn.close()
+        return row['rows'] if row is not None else None
+    
+    def _dispatch(self):
+        """Dispatcher thread: hand queued jobs to the pool while slots are free"""
+        last_purge = 0
+        while True:
+            try:
+                if time.time() - last_purge > 60:
+                    self._purge()
+                    last_purge = time.time()
+                
+                job_id = self._claim()
+                if job_id is None:
+                    self._stop_idle_pool()
+                    time.sleep(self.poll_interval)
+                    continue
+                
+                self._submit(job_id)
+            except Exception as e:
+                self.engine._log("⚠️  Job dispatcher error: %s", e)
+                time.sleep(self.poll_interval)
+    
+    def _submit(self, job_id):
+        """Hand a claimed job to the pool, or back to the queue if the pool can't take it"""
+        try:
+            if self._pool is None:
+                # Spawned, not forked: a fork could copy another thread's
+                # open SQLite connection into the worker
+                self._pool = ProcessPoolExecutor(max_workers=self.max_running,
+                                                 mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=_init_worker, initargs=(self.engine,))
+            future = self._pool.submit(_run_job, self.db_path, job_id, self.page_size)
+        except BaseException as e:
+            _requeue(self.db_path, job_id)
+            if isinstance(e, BrokenProcessPool):
+                # A worker process died, the pool takes no more jobs
+                self._pool.shutdown(wait=False)
+                self._pool = None
+            raise
+        
+        with self._lock:
+            self._active += 1
+        future.add_done_callback(functools.partial(self._job_done, job_id))
+    
+    def _stop_idle_pool(self):
+        """Let the worker processes exit after pool_idle_seconds without a job"""
+        with self._lock:
+            idle = self._active == 0 and time.monotonic() - self._idle_since >= self.pool_idle_seconds
+        if idle and self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+    
+    def _job_done(self, job_id, future):
+        """A worker that crashed (instead of failing the job itself) fails it here"""
+        with self._lock:
+            self._active -= 1
+            self._idle_since = time.monotonic()
+        
+        error = future.exception()
+        if error is not None:
+            _fail(self.db_path, job_id, repr(error))
+    
+    def _claim(self):
+        """Mark the oldest queued job running if fewer than max_running are, return its id"""
+        with _transaction(self.db_path) as conn:
+            # Jobs whose process died never finish, fail them. Until its
+            # worker has started a job carries the dispatcher's pid, so a
+            # claim is reaped too if the dispatching process dies first
+            for row in conn.execute("SELECT id, pid FROM jobs WHERE status = 'running' AND pid IS NOT NULL"):
+                if not _process_alive(row['pid']):
+                    conn.execute("UPDATE jobs SET status = 'failed', error = ?, finished = ? WHERE id = ?",
+                                 ('worker process died', time.time(), row['id']))
+            
+            running = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'running'").fetchone()[0]
+            if running >= self.max_running:
+                return None
+            
+            row = conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1").fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE jobs SET status = 'running', started = ?, pid = ? WHERE id = ?",
+                         (time.time(), os.getpid(), row['id']))
+            return row['id']
+    
+    def _purge(self):
+        """Drop finished jobs and their results after keep_seconds"""
+        cutoff = time.time() - self.keep_seconds
+        with _transaction(self.db_path) as conn:
+            expired = [row['id'] for row in conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('done', 'failed') AND finished < ?", (cutoff,)
+            )]
+            conn.executemany('DELETE FROM pages WHERE job_id = ?', [(job_id,) for job_id in expired])
+            conn.executemany('DELETE FROM jobs WHERE id = ?', [(job_id,) for job_id in expired])
+        
+        # Inputs of jobs whose worker crashed are still on disk
+        for job_id in expired:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(_input_path(self.db_path, job_id))
@@ -0,0 +1,63 @@
+"""
+HumanChurnML - Parallel Execution
+Split activities into customer shards and compute engagement on all cores
+"""
+
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.production.readers import ACTIVITY_COLUMNS
+from src.production.timestamps import TimestampParser
+
+
+def shard_ids(customer_ids, n_shards):
+    """Hash-partition customer ids into n_shards (same id = same shard)"""
+    hashes = pd.util.hash_pandas_object(customer_ids, index=False).to_numpy()
+    return hashes % np.uint64(n_shards)
+
+
+def _shard_metrics(engine, path, now, parser):
+    """Worker: engagement metrics for one shard file"""
+    activities = pd.read_pickle(path)
+    activities['date'] = engine._activity_dates(activities, parser, now)
+    return engine._activity_metrics(activities, now)
+
+
+def sharded_activity_metrics(engine, activities, workers, now):
+    """
+    Per-customer engagement metrics computed in a process pool
+    
+    Activities are hash-partitioned by customer_id and written to one file
+    per shard, so each worker loads only its own slice instead of being
+    sent the whole frame. Every customer lands in exactly one shard, so the
+    shard results concatenate into the same metrics the serial path builds.
+    The timestamp format (or epoch unit) is detected once from the whole
+    column, as the serial path does, so a shard of only day <= 12 dates
+    can't read dd/mm/yyyy month-first.
+    """
+    columns = [c for c in activities.columns if c in ACTIVITY_COLUMNS]
+    
+    parser = TimestampParser()
+    for column in ['timestamp', 'date']:
+        if column in activities.columns:
+            parser.detect(activities[column])
+            break
+    
+    shards = shard_ids(activities['customer_id'], workers)
+    
+    with tempfile.TemporaryDirectory(prefix='churn_shards_') as shard_dir:
+        paths = []
+        for shard, part in activities[columns].groupby(shards, sort=True):
+            path = os.path.join(shard_dir, f'shard_{shard}.pkl')
+            part.to_pickle(path)
+            paths.append(path)
+        
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_shard_metrics, engine, path, now, parser) for path in paths]
+            results = [future.result() for future in futures]
+    
+    return pd.concat(results)
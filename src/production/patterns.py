@@ -0,0 +1,87 @@
+"""
+HumanChurnML - Pattern Registry
+Load each patterns file once per process and share it between engines
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+# models/universal_patterns.json, resolved from the package, not the cwd
+DEFAULT_PATTERNS_PATH = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', '..', 'models', 'universal_patterns.json'
+))
+
+# A loaded patterns file: read-only patterns plus what identifies them
+PatternSet = namedtuple('PatternSet', ['path', 'mtime', 'version', 'patterns'])
+
+
+def freeze(value):
+    """Read-only copy of nested dicts and lists"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class PatternRegistry:
+    """
+    Process-wide cache of parsed patterns files
+    
+    Each file is parsed once and handed out as a read-only PatternSet. The
+    file's mtime is re-checked at most every check_interval seconds, so
+    building engines in a hot loop does no disk I/O, while an edited
+    patterns file is still picked up.
+    """
+    
+    def __init__(self, check_interval=1.0):
+        self.check_interval = check_interval
+        self._entries = {}
+        self._lock = threading.Lock()
+    
+    def get(self, path=DEFAULT_PATTERNS_PATH):
+        """PatternSet for a patterns file, or None if the file doesn't exist"""
+        path = os.path.abspath(path)
+        
+        entry = self._entries.get(path)
+        if entry is not None and time.monotonic() - entry[0] < self.check_interval:
+            return entry[1]
+        
+        with self._lock:
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                pattern_set = None
+            else:
+                pattern_set = entry[1] if entry is not None else None
+                if pattern_set is None or pattern_set.mtime != mtime:
+                    pattern_set = self._load(path, mtime)
+            
+            self._entries[path] = (time.monotonic(), pattern_set)
+            return pattern_set
+    
+    def clear(self):
+        """Forget every cached file"""
+        with self._lock:
+            self._entries.clear()
+    
+    def _load(self, path, mtime):
+        """Parse a patterns file"""
+        with open(path, 'rb') as f:
+            raw = f.read()
+        
+        return PatternSet(
+            path=path,
+            mtime=mtime,
+            version=hashlib.sha256(raw).hexdigest()[:12],
+            patterns=freeze(json.loads(raw)['discovered_patterns'])
+        )
+
+
+# Shared by every engine in the process
+PATTERN_REGISTRY = PatternRegistry()
@@ -0,0 +1,89 @@
+"""
+HumanChurnML - Top-K Ranking
+Pick the highest scoring customers without sorting the whole frame
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _descending_key(values):
+    """Float key where missing values rank last"""
+    key = np.asarray(values, dtype=np.float64)
+    return np.where(np.isnan(key), -np.inf, key)
+
+
+def _kth_largest(values, k):
+    """The k-th largest value (k >= 1), in linear time"""
+    return values[np.argpartition(-values, k - 1)[k - 1]]
+
+
+def top_k(df, k, by='churn_risk', tie_break='predicted_ltv', above=None):
+    """
+    The k rows with the highest `by`, highest `tie_break` first on ties
+    
+    Same rows and order as sort_values([by, tie_break], ascending=False,
+    kind='stable').head(k), but only the k rows that make it are sorted:
+    np.argpartition finds the k-th largest score in linear time, and again
+    the k-th largest tie_break among the rows tied at that score (risk is
+    capped at 100, so most of a large frame can tie there).
+    Rows with a missing `by`, or not above `above` when given, are skipped.
+    """
+    score = np.asarray(df[by], dtype=np.float64)
+    keep = ~np.isnan(score)
+    if above is not None:
+        keep &= score > above
+    
+    rows = np.flatnonzero(keep)
+    if k <= 0 or len(rows) == 0:
+        return df.iloc[:0]
+    
+    def tie_key(rows):
+        if tie_break is None:
+            return np.zeros(len(rows))
+        return _descending_key(df[tie_break].to_numpy()[rows])
+    
+    # Everything above the k-th largest score is in, then the best of the
+    # rows tied at it by tie_break, then full ties in their original order
+    if len(rows) > k:
+        kth = _kth_largest(score[rows], k)
+        tied = rows[score[rows] == kth]
+        rows = rows[score[rows] > kth]
+        
+        need = k - len(rows)
+        if len(tied) > need:
+            tie = tie_key(tied)
+            tie_kth = _kth_largest(tie, need)
+            better = tied[tie > tie_kth]
+            tied = np.concatenate([better, tied[tie == tie_kth][:need - len(better)]])
+        rows = np.concatenate([rows, tied])
+    
+    # lexsort: last key first, position keeps the original order on full ties
+    order = np.lexsort((rows, -tie_key(rows), -score[rows]))
+    return df.iloc[rows[order]]
+
+
+class TopK:
+    """
+    Running top k over a stream of DataFrame chunks
+    
+    Only the current k best rows are kept between chunks, so memory stays
+    at k rows plus one chunk however long the stream is.
+    """
+    
+    def __init__(self, k, by='churn_risk', tie_break='predicted_ltv', above=None):
+        self.k = k
+        self.by = by
+        self.tie_break = tie_break
+        self.above = above
+        self.best = None
+    
+    def add(self, chunk):
+        """Fold a chunk into the running top k"""
+        # Earlier rows go first so full ties keep stream order
+        rows = chunk if self.best is None else pd.concat([self.best, chunk])
+        self.best = top_k(rows, self.k, self.by, self.tie_break, self.above)
+    
+    def result(self):
+        """The top k rows seen so far, best first (None before any chunk)"""
+        return self.best
@@ -0,0 +1,45 @@
+"""
+HumanChurnML - File Readers
+Read customer and activity exports in CSV or Parquet format
+"""
+
+import pandas as pd
+
+# Activity columns the engine uses, everything else is skipped on read
+ACTIVITY_COLUMNS = ['customer_id', 'timestamp', 'date', 'duration', 'value']
+
+
+def _is_parquet(path):
+    """Parquet files are recognised by extension"""
+    return str(path).lower().endswith(('.parquet', '.pq'))
+
+
+def _parquet_file(path):
+    """Open a Parquet file, pyarrow is only needed for Parquet input"""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Reading Parquet files requires pyarrow: pip install pyarrow")
+    return pq.ParquetFile(path)
+
+
+def read_customers(path):
+    """Read the customer list (only 'customer_id' is used)"""
+    if _is_parquet(path):
+        return _parquet_file(path).read(columns=['customer_id']).to_pandas()
+    return pd.read_csv(path, usecols=['customer_id'])
+
+
+def iter_activity_chunks(path, chunksize):
+    """Yield activity DataFrames of at most chunksize rows"""
+    if _is_parquet(path):
+        parquet = _parquet_file(path)
+        columns = [c for c in parquet.schema_arrow.names if c in ACTIVITY_COLUMNS]
+        for batch in parquet.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(
+            path,
+            chunksize=chunksize,
+            usecols=lambda column: column in ACTIVITY_COLUMNS
+        )
@@ -0,0 +1,168 @@
+"""
+HumanChurnML - Result Cache
+Reuse analysis results for datasets that were already scored
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def _hash_values(values):
+    """Bytes identifying a column or index's values"""
+    if isinstance(values, pd.RangeIndex):
+        return repr(values).encode()
+    if isinstance(values.dtype, np.dtype) and values.dtype.kind in 'biufcmM':
+        return np.ascontiguousarray(values.to_numpy()).tobytes()
+    
+    # hash_array falls back to str() for anything but strings, so 1 and '1'
+    # would hash the same: only all-string columns go through it (with
+    # categorize=False to skip a factorize pass), the rest is pickled with
+    # its types
+    values = np.asarray(values, dtype=object)
+    kind = pd.api.types.infer_dtype(values)
+    if kind == 'string':
+        hashed = pd.util.hash_array(values, categorize=False).tobytes()
+    else:
+        hashed = pickle.dumps(values, protocol=pickle.HIGHEST_PROTOCOL)
+    return kind.encode() + hashed
+
+
+def frame_digest(df):
+    """Content hash of a DataFrame (values, index, column names and dtypes)"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode())
+    digest.update(_hash_values(df.index))
+    for column in df.columns:
+        digest.update(_hash_values(df[column]))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    LRU cache of analysis results keyed by input content
+    
+    Results are kept in memory up to max_entries and max_bytes, the least
+    recently used result is evicted first. With disk_dir set, results are
+    also written there and reloaded on a memory miss, so they survive
+    restarts.
+    
+    Counters: hits, disk_hits, misses and evictions (see stats()).
+    """
+    
+    def __init__(self, max_entries=32, max_bytes=512 * 1024 ** 2, disk_dir=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+    
+    def key(self, *parts, frames=()):
+        """Cache key for some DataFrames plus any other identifying values"""
+        digest = hashlib.blake2b(digest_size=16)
+        for df in frames:
+            digest.update(frame_digest(df).encode())
+        digest.update(repr(parts).encode())
+        return digest.hexdigest()
+    
+    def get(self, key):
+        """Cached result for a key (a copy), or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0].copy()
+        
+        result = self._read_disk(key)
+        
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, result)
+        
+        return result.copy()
+    
+    def put(self, key, result):
+        """Store a result under a key"""
+        result = result.copy()
+        
+        with self._lock:
+            self._remember(key, result)
+        
+        self._write_disk(key, result)
+    
+    def clear(self):
+        """Drop every in-memory result (the disk tier is kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def stats(self):
+        """Counters and current size"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes
+            }
+    
+    def _remember(self, key, result):
+        """Add to the in-memory tier and evict down to the limits (lock held)"""
+        size = int(result.memory_usage(index=True, deep=True).sum())
+        if size > self.max_bytes:
+            return
+        
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        
+        self._entries[key] = (result, size)
+        self._bytes += size
+        
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+    
+    def _disk_path(self, key):
+        """File holding a key's result in the disk tier"""
+        return os.path.join(self.disk_dir, f"{key}.pkl")
+    
+    def _read_disk(self, key):
+        """Load a result from the disk tier, or None"""
+        if self.disk_dir is None:
+            return None
+        
+        try:
+            return pd.read_pickle(self._disk_path(key))
+        except FileNotFoundError:
+            return None
+    
+    def _write_disk(self, key, result):
+        """Save a result to the disk tier (write then rename)"""
+        if self.disk_dir is None:
+            return
+        
+        os.makedirs(self.disk_dir, exist_ok=True)
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        pd.to_pickle(result, tmp_path)
+        os.replace(tmp_path, path)
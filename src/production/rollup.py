@@ -0,0 +1,136 @@
+"""
+HumanChurnML - Daily Rollup
+Per-customer, per-day activity totals that stand in for raw events
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.production.aggregates import TREND_WINDOW, trend_labels
+
+# Rollup columns, one row per (customer_id, date), date = NaT for undated activities
+ROLLUP_COLUMNS = ['customer_id', 'date', 'activity_count', 'duration_sum', 'duration_count', 'value_sum']
+
+# Columns summed when rollups are merged
+SUM_COLUMNS = ROLLUP_COLUMNS[2:]
+
+
+def is_rollup(df):
+    """Rollups are recognised by their 'activity_count' column"""
+    return 'activity_count' in df.columns
+
+
+def _parquet():
+    """pyarrow is only needed to save or load rollups"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Rollup files are Parquet and require pyarrow: pip install pyarrow")
+    return pa, pq
+
+
+def rollup_days(activities):
+    """
+    Roll activities with a parsed 'date' column up to customer x day
+    
+    Activities without a customer_id are dropped (they never reach the
+    engagement metrics either).
+    """
+    activities = activities[activities['customer_id'].notna()]
+    days = activities['date'].dt.normalize()
+    
+    grouped = activities.groupby([activities['customer_id'], days], sort=False, dropna=False)
+    rollup = pd.DataFrame({'activity_count': grouped.size().astype('int32')})
+    
+    if 'duration' in activities.columns:
+        rollup['duration_sum'] = grouped['duration'].sum()
+        rollup['duration_count'] = grouped['duration'].count().astype('int32')
+    
+    if 'value' in activities.columns:
+        rollup['value_sum'] = grouped['value'].sum()
+    
+    return rollup.reset_index()
+
+
+def merge_rollups(rollups):
+    """Combine rollups (e.g. history + today) into one row per customer-day"""
+    rollup = pd.concat(rollups, ignore_index=True)
+    columns = [c for c in SUM_COLUMNS if c in rollup.columns]
+    
+    grouped = rollup.groupby(['customer_id', 'date'], sort=False, dropna=False)
+    return grouped[columns].sum().reset_index()
+
+
+def write_rollup(rollup, path):
+    """Save a rollup as a Parquet file (write then rename)"""
+    pa, pq = _parquet()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    
+    tmp_path = f"{path}.tmp"
+    pq.write_table(pa.Table.from_pandas(rollup, preserve_index=False), tmp_path, compression='zstd')
+    os.replace(tmp_path, path)
+
+
+def read_rollup(path):
+    """Load a rollup saved by write_rollup"""
+    _, pq = _parquet()
+    return pq.read_table(path).to_pandas()
+
+
+def rollup_metrics(rollup, now):
+    """
+    Per-customer engagement metrics from a rollup, indexed by customer_id
+    
+    Same columns _calculate_engagement derives from raw events. Every
+    activity counts as happening at midnight of its day, so results match
+    the raw events exactly when their timestamps are day-level.
+    """
+    # Undated days sort last, like undated activities in the raw trend
+    rollup = rollup.sort_values('date', kind='stable')
+    grouped = rollup.groupby('customer_id', sort=False)
+    counts = grouped['activity_count']
+    
+    total = counts.sum()
+    metrics = pd.DataFrame({
+        'total_activities': total,
+        'active_days': grouped['date'].nunique(),
+        'recency_days': (now - grouped['date'].max()).dt.days,
+        'frequency_trend': _trends(rollup, grouped, total)
+    })
+    
+    if 'duration_sum' in rollup.columns:
+        metrics['avg_duration'] = grouped['duration_sum'].sum() / grouped['duration_count'].sum()
+    else:
+        metrics['avg_duration'] = 0
+    
+    if 'value_sum' in rollup.columns:
+        metrics['total_value'] = grouped['value_sum'].sum()
+    else:
+        metrics['total_value'] = 0
+    
+    return metrics
+
+
+def _trends(rollup, grouped, total):
+    """
+    Frequency trend from date-sorted rollup rows
+    
+    A day is among a customer's first (last) TREND_WINDOW activities when
+    fewer than TREND_WINDOW activities come before (after) it.
+    """
+    codes = grouped.ngroup().to_numpy()
+    count = rollup['activity_count'].to_numpy()
+    through = grouped['activity_count'].cumsum().to_numpy()
+    
+    before = through - count
+    after = total.to_numpy()[codes] - through
+    valid = rollup['date'].notna().to_numpy()
+    
+    old_count = np.bincount(codes[valid & (before < TREND_WINDOW)], minlength=len(total))
+    recent_count = np.bincount(codes[valid & (after < TREND_WINDOW)], minlength=len(total))
+    trends = trend_labels(total.to_numpy(), old_count, recent_count)
+    
+    return pd.Series(trends, index=total.index, dtype=object)
@@ -0,0 +1,185 @@
+"""
+HumanChurnML - Scoring Plan
+Compile the scoring tables for one industry into lookup arrays
+"""
+
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+# Scoring tables used when the patterns file doesn't override them.
+# An industry overrides any of them with a "scoring" entry in
+# universal_patterns.json, e.g. "saas": {"scoring": {"recency_weight": 0.8}}
+DEFAULT_SCORING = {
+    # Highest activity count for each level, the last level takes the rest
+    'level_max_activities': {
+        'Never Active': 0,
+        'Tried Once': 1,
+        'Casual': 2,
+        'Regular': 4,
+        'Loyal': 8
+    },
+    'level_risk': {
+        'Never Active': 95,
+        'Tried Once': 80,
+        'Casual': 60,
+        'Regular': 40,
+        'Loyal': 20,
+        'Super Customer': 10
+    },
+    'unknown_level_risk': 50,
+    'recency_weight': 0.5,
+    'trend_penalty': {
+        'decreasing': 15,
+        'stable': 0,
+        'increasing': -10,
+        'inactive': 20,
+        'unknown': 0
+    },
+    'level_values': {
+        'Never Active': 0,
+        'Tried Once': 160,
+        'Casual': 250,
+        'Regular': 390,
+        'Loyal': 510,
+        'Super Customer': 630
+    },
+    'unknown_level_value': 100,
+    # Churn risk above each threshold moves a customer up one action band
+    'action_thresholds': [30, 50, 70, 85]
+}
+
+# Tier names in the patterns file that differ from the engine's levels,
+# matched by rank (gaming: Hardcore and Obsessed players)
+LEVEL_ALIASES = {'Hardcore': 'Loyal', 'Obsessed': 'Super Customer'}
+
+
+def _table(values, labels, default):
+    """Array of values in label order, plus default at the end for code -1"""
+    return np.array([values.get(label, default) for label in labels] + [default], dtype=np.float64)
+
+
+class ScoringPlan:
+    """
+    Scoring tables for one industry as lookup arrays
+    
+    Levels come from one searchsorted over the activity-count edges, risk
+    and lifetime value from gathers indexed by level and trend codes.
+    Code -1 (unknown) picks up the trailing default of every table.
+    """
+    
+    def __init__(self, scoring, levels, trends):
+        self.levels = list(levels)
+        self.trends = list(trends)
+        
+        max_activities = scoring['level_max_activities']
+        self.level_edges = np.array([max_activities[level] for level in self.levels[:-1]], dtype=np.float64)
+        
+        self.level_risk = _table(scoring['level_risk'], self.levels, scoring['unknown_level_risk'])
+        self.trend_penalty = _table(scoring['trend_penalty'], self.trends, 0)
+        self.level_values = _table(scoring['level_values'], self.levels, scoring['unknown_level_value'])
+        self.recency_weight = scoring['recency_weight']
+        self.action_thresholds = np.sort(np.asarray(scoring['action_thresholds'], dtype=np.float64))
+    
+    def level_codes(self, total_activities):
+        """Engagement level code per customer (-1 when the count is missing)"""
+        total = np.asarray(total_activities, dtype=np.float64)
+        codes = np.searchsorted(self.level_edges, total, side='left')
+        codes[np.isnan(total)] = -1
+        return codes
+    
+    def trend_codes(self, trends):
+        """Frequency trend code per customer (-1 = not a known trend)"""
+        return pd.Categorical(trends, categories=self.trends).codes
+    
+    def raw_risk(self, level_codes, recency_days, trend_codes):
+        """Churn risk before clipping to 0-100"""
+        recency = np.asarray(recency_days, dtype=np.float64)
+        return self.level_risk[level_codes] + recency * self.recency_weight + self.trend_penalty[trend_codes]
+    
+    def risk(self, level_codes, recency_days, trend_codes):
+        """Churn risk 0-100"""
+        return np.clip(self.raw_risk(level_codes, recency_days, trend_codes), 0, 100)
+    
+    def bands(self, risk):
+        """Number of action thresholds each risk is above (0 when risk is missing)"""
+        bands = np.searchsorted(self.action_thresholds, risk, side='left')
+        bands[np.isnan(risk)] = 0
+        return bands
+
+
+def derived_scoring(industry_patterns):
+    """
+    Scoring tables derived from an industry's discovered patterns
+    
+    - level_risk: 100 x (1 - retention), from each tier's 7-day retention
+      (gaming) or repeat purchase rate (ecommerce)
+    - level_values: each tier's average spend, or its value multiplier
+      times the value of a one-time customer
+    """
+    level_risk, level_values = {}, {}
+    base_value = DEFAULT_SCORING['level_values']['Tried Once']
+    
+    for tier, stats in industry_patterns.items():
+        if tier == 'scoring' or not isinstance(stats, Mapping):
+            continue
+        level = LEVEL_ALIASES.get(tier, tier)
+        
+        retention = stats.get('retention_7day', stats.get('repeat_rate'))
+        if retention is not None:
+            level_risk[level] = round(100 * (1 - retention), 1)
+        
+        if 'avg_spend' in stats:
+            level_values[level] = stats['avg_spend']
+        elif 'value_multiplier' in stats:
+            level_values[level] = round(base_value * stats['value_multiplier'], 2)
+    
+    derived = {}
+    if level_risk:
+        derived['level_risk'] = level_risk
+    if level_values:
+        derived['level_values'] = level_values
+    return derived
+
+
+def _merge(scoring, overrides):
+    """Overrides on top of scoring tables, dict tables merged key by key"""
+    for key, value in overrides.items():
+        if isinstance(scoring.get(key), dict):
+            scoring[key] = {**scoring[key], **value}
+        else:
+            scoring[key] = value
+
+
+def validate_scoring(scoring, levels):
+    """Raise ValueError for scoring tables that would score silently wrong"""
+    for key in ['level_max_activities', 'level_risk', 'level_values']:
+        unknown = set(scoring[key]) - set(levels)
+        if unknown:
+            raise ValueError(f"Unknown levels in scoring '{key}': {sorted(unknown)}")
+    
+    # searchsorted needs increasing edges, otherwise levels come out wrong
+    edges = [scoring['level_max_activities'][level] for level in levels[:-1]]
+    if any(later <= earlier for earlier, later in zip(edges, edges[1:])):
+        raise ValueError(f"Scoring 'level_max_activities' must increase level by level, got {edges}")
+    
+    if scoring['recency_weight'] < 0:
+        raise ValueError(f"Scoring 'recency_weight' can't be negative, got {scoring['recency_weight']}")
+
+
+def compile_plan(patterns, industry, levels, trends):
+    """
+    ScoringPlan for an industry
+    
+    Defaults, then tables derived from the industry's discovered patterns,
+    then its explicit "scoring" entry, each overriding the one before.
+    """
+    scoring = dict(DEFAULT_SCORING)
+    
+    industry_patterns = patterns.get(industry) or {}
+    _merge(scoring, derived_scoring(industry_patterns))
+    _merge(scoring, industry_patterns.get('scoring') or {})
+    
+    validate_scoring(scoring, list(levels))
+    return ScoringPlan(scoring, levels, trends)
@@ -0,0 +1,124 @@
+"""
+HumanChurnML - Engagement State Store
+Keep engagement aggregates on disk and update them with daily deltas
+"""
+
+import contextlib
+import functools
+import os
+import pandas as pd
+
+from src.production.aggregates import EngagementAggregates
+
+# Day segments written before update() merges them into one
+MAX_DAY_SEGMENTS = 30
+
+
+def _read_segments(days_dir, segments):
+    """Distinct-day tables of some segment files, in order"""
+    return [pd.read_pickle(os.path.join(days_dir, segment)) for segment in segments]
+
+
+class EngagementStateStore:
+    """
+    Persistent per-customer engagement state
+    
+    Saves the running aggregates behind _calculate_engagement to local
+    disk. update() folds in only the new activities and score() re-runs
+    the scoring steps on the stored state, so a daily run no longer
+    re-reads the full activity history.
+    
+    Each batch of activities must be passed to update() exactly once.
+    
+    The distinct (customer_id, date) pairs behind active_days grow with
+    the history, so they are kept in segment files next to the state
+    (path + '.days/'). update() writes only the delta's new days as one
+    more segment and rewrites the per-customer part, which follows the
+    number of customers. The segments are only read when score() (or
+    save()) needs the days, never by update(). Every MAX_DAY_SEGMENTS
+    updates the segments are merged back into one.
+    """
+    
+    def __init__(self, path, engine):
+        self.path = path
+        self.engine = engine
+        self.days_dir = f"{path}.days"
+        self.segments = []
+        self.aggregates = self._load()
+    
+    def _load(self):
+        """Load the saved state, or start empty"""
+        if not os.path.exists(self.path):
+            return EngagementAggregates()
+        
+        state = pd.read_pickle(self.path)
+        aggregates = state['aggregates']
+        self.segments = state['day_segments']
+        aggregates.restore_days(functools.partial(_read_segments, self.days_dir, self.segments))
+        return aggregates
+    
+    def save(self):
+        """Write the whole state, all distinct days as a single segment"""
+        self._write(self.aggregates.distinct_days(), replace=True)
+    
+    def _write(self, days, replace=False):
+        """
+        Write one new day segment, then the state pointing at it
+        
+        Both are written then renamed, so a crash leaves the previous
+        state intact (plus at most an unused segment file).
+        """
+        os.makedirs(self.days_dir, exist_ok=True)
+        
+        number = max([int(s.split('.')[0]) for s in self.segments], default=0) + 1
+        segment = f"{number:06d}.pkl"
+        segment_path = os.path.join(self.days_dir, segment)
+        pd.to_pickle(days, f"{segment_path}.tmp")
+        os.replace(f"{segment_path}.tmp", segment_path)
+        
+        old_segments = self.segments
+        segments = [segment] if replace else old_segments + [segment]
+        
+        tmp_path = f"{self.path}.tmp"
+        pd.to_pickle({'aggregates': self.aggregates.without_days(), 'day_segments': segments}, tmp_path)
+        os.replace(tmp_path, self.path)
+        self.segments = segments
+        
+        if replace:
+            for old in old_segments:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(os.path.join(self.days_dir, old))
+    
+    def update(self, new_activities):
+        """Merge a delta of new activities into the state and save it"""
+        if len(new_activities) > 0:
+            activities = self.engine._activity_frame(new_activities)
+            new_days = self.aggregates.fold(activities)
+            
+            # A new state has no segments to add to yet
+            if not self.segments or len(self.segments) + 1 >= MAX_DAY_SEGMENTS:
+                self.save()
+            else:
+                self._write(new_days)
+        
+        self.engine._log("✅ State updated with %d activities", len(new_activities))
+    
+    def score(self, customers=None, as_of=None):
+        """
+        Score customers from the stored state
+        
+        Parameters:
+        - customers: DataFrame with 'customer_id' (default: every customer
+          in the state)
+        - as_of: reference time for recency (default: now)
+        
+        Returns:
+        - DataFrame with risk scores and recommendations, the same as
+          analyze_customers on the full history
+        """
+        if customers is None:
+            customers = pd.DataFrame({'customer_id': self.aggregates.customer_ids()})
+        
+        now = self.engine._reference_time(as_of)
+        engagement = self.engine._engagement_from_aggregates(customers, self.aggregates, now)
+        return self.engine._score_engagement(engagement, as_of=now)
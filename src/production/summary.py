@@ -0,0 +1,76 @@
+"""
+HumanChurnML - Summary Statistics
+One-pass, mergeable summary of analysis results
+"""
+
+import numpy as np
+
+# Churn risk above which a customer counts as at risk
+AT_RISK_THRESHOLD = 70
+
+# Savings per at-risk customer: 30% of one-time buyer value
+SAVINGS_PER_CUSTOMER = 160 * 0.3
+
+
+class SummaryStats:
+    """
+    Partial summary of analysis results
+    
+    Holds only counts and sums, never rows, so summaries of chunks or
+    shards merge into the summary of the whole: build one per part with
+    add() and combine them with merge().
+    """
+    
+    def __init__(self, levels):
+        self.levels = list(levels)
+        self.total_customers = 0
+        self.at_risk_customers = 0
+        self.urgent_customers = 0
+        self.risk_sum = 0.0
+        self.risk_count = 0
+        self.predicted_value = 0.0
+        
+        # Customers per level code, slot 0 = unknown level (code -1)
+        self.level_counts = np.zeros(len(self.levels) + 1, dtype=np.int64)
+    
+    def add(self, analysis_df, level_codes):
+        """Fold in a chunk of results (level_codes: engagement level codes)"""
+        risk = np.asarray(analysis_df['churn_risk'], dtype=np.float64)
+        scored = ~np.isnan(risk)
+        
+        self.total_customers += len(analysis_df)
+        self.at_risk_customers += int(np.count_nonzero(risk > AT_RISK_THRESHOLD))
+        self.urgent_customers += int(np.count_nonzero(analysis_df['urgent'].to_numpy()))
+        self.risk_sum += float(risk[scored].sum())
+        self.risk_count += int(np.count_nonzero(scored))
+        self.predicted_value += float(np.nansum(np.asarray(analysis_df['predicted_ltv'], dtype=np.float64)))
+        self.level_counts += np.bincount(np.asarray(level_codes) + 1, minlength=len(self.level_counts))
+        return self
+    
+    def merge(self, other):
+        """Combine another partial summary into this one"""
+        self.total_customers += other.total_customers
+        self.at_risk_customers += other.at_risk_customers
+        self.urgent_customers += other.urgent_customers
+        self.risk_sum += other.risk_sum
+        self.risk_count += other.risk_count
+        self.predicted_value += other.predicted_value
+        self.level_counts += other.level_counts
+        return self
+    
+    def as_dict(self):
+        """The summary in get_summary_stats format"""
+        labels = ['Unknown'] + self.levels
+        order = np.argsort(-self.level_counts, kind='stable')
+        
+        return {
+            'total_customers': self.total_customers,
+            'at_risk_customers': self.at_risk_customers,
+            'urgent_customers': self.urgent_customers,
+            'avg_risk': self.risk_sum / self.risk_count if self.risk_count else float('nan'),
+            'total_predicted_value': self.predicted_value,
+            'engagement_breakdown': {
+                labels[i]: int(self.level_counts[i]) for i in order if self.level_counts[i] > 0
+            },
+            'potential_savings': round(self.at_risk_customers * SAVINGS_PER_CUSTOMER, 2)
+        }
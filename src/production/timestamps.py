@@ -0,0 +1,169 @@
+"""
+HumanChurnML - Timestamp Ingestion
+Parse activity timestamps fast: detect the format once, parse in bulk
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_datetime64_any_dtype, is_numeric_dtype
+
+# Formats tried in order against a sample, month-first like pandas
+CANDIDATE_FORMATS = [
+    '%Y-%m-%d',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%dT%H:%M',
+    '%Y-%m-%d %H:%M:%S.%f',
+    '%Y-%m-%dT%H:%M:%S.%f',
+    '%Y-%m-%dT%H:%M:%S%z',
+    '%Y-%m-%d %H:%M:%S%z',
+    '%Y-%m-%dT%H:%M:%S.%f%z',
+    '%Y/%m/%d',
+    '%Y/%m/%d %H:%M:%S',
+    '%m/%d/%Y',
+    '%m/%d/%Y %H:%M:%S',
+    '%d/%m/%Y',
+    '%d/%m/%Y %H:%M:%S',
+    '%d.%m.%Y',
+    '%d.%m.%Y %H:%M',
+    '%d.%m.%Y %H:%M:%S'
+]
+
+# Detected format meaning "no candidate matched, let pandas infer"
+INFER = ''
+
+SAMPLE_SIZE = 1000
+
+
+def _sample(values):
+    """Up to SAMPLE_SIZE non-null values spread over the column"""
+    step = max(len(values) // SAMPLE_SIZE, 1)
+    return values.iloc[::step].dropna().iloc[:SAMPLE_SIZE]
+
+
+def detect_format(values):
+    """First candidate format that parses every sampled value (INFER if none)"""
+    sample = _sample(values)
+    if len(sample) == 0 or not all(isinstance(value, str) for value in sample):
+        return INFER
+    
+    for fmt in CANDIDATE_FORMATS:
+        try:
+            pd.to_datetime(sample, format=fmt)
+        except (ValueError, TypeError):
+            continue
+        return fmt
+    
+    return INFER
+
+
+def epoch_unit(values):
+    """Epoch unit of numeric timestamps, picked from their magnitude"""
+    magnitude = values.abs().max()
+    
+    # NaN (nothing but missing values) falls through as seconds
+    for unit, limit in [('s', 1e11), ('ms', 1e14), ('us', 1e17)]:
+        if not magnitude >= limit:
+            return unit
+    return 'ns'
+
+
+class TimestampParser:
+    """
+    Turns timestamp columns into datetime64 values
+    
+    The string format is detected once from a sample of the first column
+    parsed and reused for every later column or chunk. Columns with few
+    distinct values (e.g. day-level dates) are parsed once per distinct
+    value, and parsed values are kept for later chunks. Integer and float
+    columns are epoch seconds or milliseconds and never go through strings.
+    """
+    
+    def __init__(self, cache_size=100_000):
+        self.format = None
+        self.unit = None
+        self.cache_size = cache_size
+        self._cache = None
+    
+    def detect(self, values):
+        """Fix the epoch unit or string format from values, if not known yet"""
+        if is_datetime64_any_dtype(values):
+            return
+        if is_numeric_dtype(values) and not is_bool_dtype(values):
+            if self.unit is None:
+                self.unit = epoch_unit(values)
+        elif self.format is None:
+            self.format = detect_format(values)
+    
+    def parse(self, values):
+        """Parse a Series of timestamps into a datetime Series (same index)"""
+        if is_datetime64_any_dtype(values):
+            return values
+        
+        self.detect(values)
+        if is_numeric_dtype(values) and not is_bool_dtype(values):
+            return pd.to_datetime(values, unit=self.unit)
+        
+        sample = _sample(values)
+        if len(sample) > 0 and sample.nunique() < len(sample) / 2:
+            # Few distinct values: parse each one once
+            codes, uniques = pd.factorize(values)
+            parsed = self._parse_distinct(uniques)
+            dates = parsed.take(codes, allow_fill=True, fill_value=pd.NaT)
+            return pd.Series(dates, index=values.index, name=values.name)
+        
+        return self._parse_strings(values)
+    
+    def _parse_strings(self, values):
+        """Parse strings with the detected format"""
+        if self.format == INFER:
+            try:
+                return pd.to_datetime(values)
+            except ValueError:
+                # Mixed formats, parse each value on its own
+                return pd.to_datetime(values, format='mixed')
+        
+        dates = pd.to_datetime(values, format=self.format, errors='coerce')
+        
+        # Values written in some other format go through pandas' inference
+        failed = dates.isna() & values.notna()
+        if failed.any():
+            dates = dates.astype(object)
+            dates[failed] = pd.to_datetime(values[failed], format='mixed').astype(object)
+            dates = pd.to_datetime(dates)
+        
+        return dates
+    
+    def _parse_distinct(self, uniques):
+        """Parse distinct strings, reusing values parsed for earlier chunks"""
+        uniques = pd.Series(uniques)
+        
+        if self._cache is None:
+            parsed = self._parse_strings(uniques)
+        else:
+            position = self._cache.index.get_indexer(uniques)
+            missing = position < 0
+            
+            parsed = self._cache.iloc[np.maximum(position, 0)].reset_index(drop=True)
+            if missing.any():
+                parsed = parsed.astype(object)
+                parsed[missing] = self._parse_strings(uniques[missing]).astype(object)
+                parsed = pd.to_datetime(parsed)
+        
+        self._remember(uniques, parsed)
+        return pd.DatetimeIndex(parsed)
+    
+    def _remember(self, uniques, parsed):
+        """Add newly parsed values to the cache, up to cache_size entries"""
+        cached = 0 if self._cache is None else len(self._cache)
+        room = self.cache_size - cached
+        if room <= 0:
+            return
+        
+        new = pd.Series(parsed.to_numpy(), index=uniques.to_numpy())
+        if self._cache is not None:
+            new = new[~new.index.isin(self._cache.index)]
+        new = new.iloc[:room]
+        
+        self._cache = new if self._cache is None else pd.concat([self._cache, new])
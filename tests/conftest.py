@@ -0,0 +1,29 @@
+"""
+HumanChurnML - Shared Test Setup
+Repo root on the import path and engines with their startup output silenced
+"""
+
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.production.churn_engine import ChurnEngine
+
+
+@pytest.fixture(scope='session')
+def make_engine():
+    """Build a ChurnEngine quietly, e.g. make_engine(industry='gaming')"""
+    def make(**kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return ChurnEngine(company_name="Test", **kwargs)
+    return make
+
+
+@pytest.fixture(scope='session')
+def engine(make_engine):
+    """Default engine shared by the tests"""
+    return make_engine()
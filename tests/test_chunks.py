@@ -0,0 +1,52 @@
+"""
+HumanChurnML - Chunked Analysis Tests
+analyze_chunks against analyze_customers on the same activities
+Run with: python -m pytest tests
+"""
+
+import contextlib
+import io
+import warnings
+
+import pandas as pd
+import pytest
+
+from tests.test_engagement import AS_OF, random_frames
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_chunks_match_full_analysis(engine, seed):
+    customers, activities = random_frames(seed)
+    original = activities.copy()
+    
+    # Sliced chunks, the way a caller splitting a big frame passes them
+    chunks = [activities.iloc[start:start + 97] for start in range(0, len(activities), 97)]
+    
+    with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter('error')
+        result = engine.analyze_chunks(chunks, customers, as_of=AS_OF)
+        expected = engine.analyze_customers(customers, activities, as_of=AS_OF)
+    
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    pd.testing.assert_frame_equal(activities, original)
+    for chunk in chunks:
+        assert 'date' not in chunk.columns
+
+
+def test_calendar_days(engine):
+    customers, activities = random_frames(1)
+    chunks = [activities.iloc[start:start + 97] for start in range(0, len(activities), 97)]
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = engine.analyze_chunks(chunks, customers, as_of=AS_OF, calendar_days=True)
+        expected = engine.analyze_customers(customers, activities, as_of=AS_OF)
+    
+    # active_days counts calendar days, everything else is unchanged
+    dates = pd.to_datetime(activities['timestamp']).dt.normalize()
+    calendar = dates.groupby(activities['customer_id']).nunique()
+    active_days = calendar.reindex(expected['customer_id'], fill_value=0).to_numpy()
+    assert (result['active_days'].to_numpy() == active_days).all()
+    assert (result['active_days'] <= expected['active_days']).all()
+    
+    columns = [col for col in expected.columns if col != 'active_days']
+    pd.testing.assert_frame_equal(result[columns], expected[columns], check_dtype=False)
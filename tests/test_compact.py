@@ -0,0 +1,41 @@
+"""
+HumanChurnML - Compact Results Tests
+compact=True against the full-width results
+Run with: python -m pytest tests
+"""
+
+import contextlib
+import io
+
+import pandas as pd
+import pytest
+
+from tests.test_engagement import AS_OF, random_frames
+
+
+def analyze_both(engine, customers, activities):
+    with contextlib.redirect_stdout(io.StringIO()):
+        full = engine.analyze_customers(customers, activities, as_of=AS_OF)
+        compact = engine.analyze_customers(customers, activities, as_of=AS_OF, compact=True)
+    return full, compact
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_same_values(engine, seed):
+    full, compact = analyze_both(engine, *random_frames(seed))
+    
+    for column in ['total_activities', 'active_days', 'recency_days', 'engagement_level', 'frequency_trend']:
+        pd.testing.assert_series_equal(compact[column].astype(object), full[column].astype(object))
+    pd.testing.assert_series_equal(compact['churn_risk'], full['churn_risk'], check_dtype=False, rtol=1e-6)
+
+
+def test_placeholder_date_doesnt_wrap(engine):
+    # Only dated activities, so recency is an integer column
+    customers = pd.DataFrame({'customer_id': ['A', 'B']})
+    activities = pd.DataFrame({'customer_id': ['A', 'B'], 'timestamp': ['1900-01-01', '2024-04-01']})
+    
+    full, compact = analyze_both(engine, customers, activities)
+    
+    assert list(compact['recency_days']) == list(full['recency_days'])
+    assert compact['recency_days'].iloc[0] == (AS_OF - pd.Timestamp('1900-01-01')).days
+    assert compact['churn_risk'].iloc[0] == 100
@@ -0,0 +1,69 @@
+"""
+HumanChurnML - CRM Export Tests
+Compression by extension and replacing the files of an earlier export
+Run with: python -m pytest tests
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from src.production.crm_export import write_export
+
+EXPORT = pd.DataFrame({'customer_id': [f'C{i:03d}' for i in range(10)], 'status': 'Casual'})
+
+
+@pytest.mark.parametrize('extension, magic', [
+    ('.csv.gz', b'\x1f\x8b'),
+    ('.csv.bz2', b'BZh'),
+    ('.csv.xz', b'\xfd7zXZ'),
+    ('.csv.zip', b'PK'),
+    ('.csv.zst', b'\x28\xb5\x2f\xfd')
+])
+def test_compression_from_extension(tmp_path, extension, magic):
+    if extension == '.csv.zst':
+        pytest.importorskip('zstandard')
+    path = str(tmp_path / f'crm{extension}')
+    
+    write_export(EXPORT, path)
+    
+    with open(path, 'rb') as f:
+        assert f.read(len(magic)) == magic
+    pd.testing.assert_frame_equal(pd.read_csv(path), EXPORT)
+
+
+def test_smaller_export_removes_stale_parts(tmp_path):
+    path = str(tmp_path / 'crm.csv')
+    (tmp_path / 'notes.csv').write_text('keep')
+    
+    first = write_export(EXPORT, path, max_rows=2)
+    assert len(first) == 5
+    
+    second = write_export(EXPORT, path, max_rows=4)
+    assert sorted(os.listdir(tmp_path)) == ['crm_part001.csv', 'crm_part002.csv', 'crm_part003.csv', 'notes.csv']
+    pd.testing.assert_frame_equal(pd.concat(map(pd.read_csv, second), ignore_index=True), EXPORT)
+    
+    # Back to a single file, every part goes
+    assert write_export(EXPORT, path) == [path]
+    assert sorted(os.listdir(tmp_path)) == ['crm.csv', 'notes.csv']
+
+
+def test_failed_export_keeps_previous_files(tmp_path, monkeypatch):
+    path = str(tmp_path / 'crm.csv')
+    write_export(EXPORT, path, max_rows=4)
+    before = {name: (tmp_path / name).read_bytes() for name in os.listdir(tmp_path)}
+    
+    # The second part fails to write, nothing of the new export is moved in
+    to_csv = pd.DataFrame.to_csv
+    
+    def failing_to_csv(self, target, **kwargs):
+        if target.endswith('part002.csv'):
+            raise OSError("disk full")
+        return to_csv(self, target, **kwargs)
+    
+    monkeypatch.setattr(pd.DataFrame, 'to_csv', failing_to_csv)
+    with pytest.raises(OSError):
+        write_export(EXPORT.iloc[:6], path, max_rows=2)
+    
+    assert {name: (tmp_path / name).read_bytes() for name in os.listdir(tmp_path)} == before
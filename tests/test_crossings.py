@@ -0,0 +1,67 @@
+"""
+HumanChurnML - Crossing Index Tests
+advance_to() against a full analyze_customers at the same date
+Run with: python -m pytest tests
+"""
+
+import contextlib
+import io
+
+import pandas as pd
+import pytest
+
+from tests.test_engagement import AS_OF, random_frames
+
+RESCORED = ['recency_days', 'churn_risk', 'recommended_action', 'predicted_ltv', 'urgent']
+
+
+def with_future_super_customer(customers, activities):
+    """
+    Add a Super Customer with an increasing trend whose last activity is
+    10 days after AS_OF, so their unclipped risk starts below 0
+    """
+    old = [AS_OF - pd.Timedelta(days=30)] * 3
+    recent = [AS_OF - pd.Timedelta(days=day) for day in range(6, 0, -1)] + [AS_OF + pd.Timedelta(days=10)]
+    timestamps = [str(ts) for ts in old + recent]
+    
+    customers = pd.concat([customers, pd.DataFrame({'customer_id': ['FUTURE']})], ignore_index=True)
+    future = pd.DataFrame({'customer_id': 'FUTURE', 'timestamp': timestamps, 'duration': 10, 'value': 1.0})
+    return customers, pd.concat([activities, future], ignore_index=True)
+
+
+def analyze(engine, customers, activities, as_of, compact=False):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return engine.analyze_customers(customers, activities, as_of=as_of, compact=compact)
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_advance_matches_full_rescore(engine, compact):
+    customers, activities = with_future_super_customer(*random_frames(0, n_customers=200, n_activities=2000))
+    results = analyze(engine, customers, activities, AS_OF, compact)
+    index = engine.crossing_index(results)
+    
+    for days in [1, 2, 7, 30, 60, 65, 70, 71, 75, 120, 400]:
+        date = AS_OF + pd.Timedelta(days=days)
+        changed = index.advance_to(date)
+        expected = analyze(engine, customers, activities, date, compact)
+        
+        # Actions are current for everyone, the changed rows in full
+        for column in ['recommended_action', 'urgent']:
+            assert (results[column].astype(str).to_numpy() == expected[column].astype(str).to_numpy()).all()
+        pd.testing.assert_frame_equal(changed[RESCORED], expected.loc[changed.index, RESCORED], check_dtype=False)
+
+
+def test_negative_risk_crosses_late(engine):
+    customers, activities = with_future_super_customer(*random_frames(0, n_customers=5, n_activities=0))
+    results = analyze(engine, customers, activities, AS_OF)
+    
+    future = results.index[results['customer_id'] == 'FUTURE'][0]
+    assert results.loc[future, 'engagement_level'] == 'Super Customer'
+    assert results.loc[future, 'frequency_trend'] == 'increasing'
+    assert results.loc[future, 'churn_risk'] == 0
+    
+    # 10 + (-10 + d) * 0.5 - 10 > 30 first on day 71
+    index = engine.crossing_index(results)
+    assert index.next_crossing() == AS_OF + pd.Timedelta(days=71)
+    assert len(index.advance_to(AS_OF + pd.Timedelta(days=70))) == 0
+    assert list(index.advance_to(AS_OF + pd.Timedelta(days=71))['customer_id']) == ['FUTURE']
@@ -0,0 +1,131 @@
+"""
+HumanChurnML - Engagement Equivalence Tests
+The grouped _calculate_engagement against the original per-customer loop
+Run with: python -m pytest tests
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+AS_OF = pd.Timestamp('2024-04-15 12:00')
+
+
+def reference_trend(activities):
+    """Original per-customer trend: distinct dates in the first vs last 3 activities"""
+    if len(activities) < 3:
+        return 'stable'
+    
+    activities = activities.sort_values('date')
+    recent_count = activities.tail(3)['date'].nunique()
+    old_count = activities.head(3)['date'].nunique()
+    
+    if recent_count < old_count * 0.5:
+        return 'decreasing'
+    elif recent_count > old_count * 1.5:
+        return 'increasing'
+    else:
+        return 'stable'
+
+
+def reference_engagement(customers, activities, now):
+    """The original one-customer-at-a-time engagement loop, with a fixed now"""
+    activities = activities.copy()
+    activities['date'] = pd.to_datetime(activities['timestamp'])
+    
+    results = []
+    for cust_id in customers['customer_id'].unique():
+        cust_activities = activities[activities['customer_id'] == cust_id]
+        
+        if len(cust_activities) > 0:
+            metrics = {
+                'customer_id': cust_id,
+                'total_activities': len(cust_activities),
+                'active_days': cust_activities['date'].nunique(),
+                'recency_days': (now - cust_activities['date'].max()).days,
+                'frequency_trend': reference_trend(cust_activities)
+            }
+            
+            if 'duration' in cust_activities.columns:
+                metrics['avg_duration'] = cust_activities['duration'].mean()
+            else:
+                metrics['avg_duration'] = 0
+            
+            if 'value' in cust_activities.columns:
+                metrics['total_value'] = cust_activities['value'].sum()
+            else:
+                metrics['total_value'] = 0
+        else:
+            metrics = {
+                'customer_id': cust_id,
+                'total_activities': 0,
+                'active_days': 0,
+                'recency_days': 999,
+                'frequency_trend': 'inactive',
+                'avg_duration': 0,
+                'total_value': 0
+            }
+        
+        results.append(metrics)
+    
+    return pd.DataFrame(results)
+
+
+def random_frames(seed, n_customers=80, n_activities=600, with_duration=True, with_value=True):
+    """
+    Seeded customers and activities with the awkward cases mixed in
+    
+    - customers with no activity and customers with 1-2 activities
+    - activities of unknown customers and with a missing customer_id
+    - missing (NaT) and repeated timestamps
+    """
+    rng = np.random.default_rng(seed)
+    ids = [f'C{i:03d}' for i in range(n_customers)]
+    customers = pd.DataFrame({'customer_id': rng.permutation(ids)})
+    
+    # A third of the customers never show up, a few only once or twice
+    active = ids[:int(n_customers * 2 / 3)]
+    sparse = ids[int(n_customers * 2 / 3):int(n_customers * 3 / 4)]
+    pool = active + ['UNKNOWN', None]
+    customer_id = list(rng.choice(np.array(pool, dtype=object), size=n_activities))
+    customer_id += [cid for cid in sparse for _ in range(rng.integers(1, 3))]
+    n_rows = len(customer_id)
+    
+    timestamps = (AS_OF - pd.to_timedelta(rng.integers(0, 120 * 24, n_rows), 'h')).floor('h')
+    timestamps = pd.Series(timestamps.strftime('%Y-%m-%d %H:%M:%S'), dtype=object)
+    timestamps[rng.random(n_rows) < 0.05] = None
+    
+    activities = pd.DataFrame({'customer_id': customer_id, 'timestamp': timestamps})
+    if with_duration:
+        activities['duration'] = rng.integers(1, 60, n_rows)
+    if with_value:
+        activities['value'] = np.round(rng.random(n_rows) * 100, 2)
+    
+    return customers, activities.sample(frac=1, random_state=seed, ignore_index=True)
+
+
+@pytest.mark.parametrize('seed', range(10))
+@pytest.mark.parametrize('columns', [
+    dict(),
+    dict(with_duration=False),
+    dict(with_value=False),
+    dict(n_customers=5, n_activities=12)
+])
+def test_matches_reference_loop(engine, seed, columns):
+    customers, activities = random_frames(seed, **columns)
+    original = activities.copy()
+    
+    expected = reference_engagement(customers, activities, AS_OF)
+    result = engine._calculate_engagement(customers, activities, now=AS_OF)
+    
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    pd.testing.assert_frame_equal(activities, original)
+
+
+def test_no_activities(engine):
+    customers, activities = random_frames(0)
+    result = engine._calculate_engagement(customers, activities.iloc[:0], now=AS_OF)
+    
+    assert list(result['customer_id']) == list(customers['customer_id'])
+    assert (result['frequency_trend'] == 'unknown').all()
+    assert (result['recency_days'] == 999).all()
@@ -0,0 +1,105 @@
+"""
+HumanChurnML - Job Queue Tests
+Claiming jobs and reaping the ones whose process died
+Run with: python -m pytest tests
+"""
+
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import time
+
+from src.production.churn_engine import ChurnEngine
+from src.production.jobs import SCHEMA, JobQueue, _connect
+from tests.test_engagement import random_frames
+
+
+def dead_pid():
+    """pid of a process that has already exited"""
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def make_queue(tmp_path, n_jobs, **kwargs):
+    """Queue with n_jobs queued jobs, schema created without starting a dispatcher"""
+    queue = JobQueue(None, db_path=str(tmp_path / 'jobs' / 'jobs.db'), **kwargs)
+    os.makedirs(tmp_path / 'jobs')
+    conn = _connect(queue.db_path)
+    try:
+        conn.executescript(SCHEMA)
+        conn.executemany("INSERT INTO jobs (id, status, created) VALUES (?, 'queued', ?)",
+                         [(f'job{n}', n) for n in range(n_jobs)])
+    finally:
+        conn.close()
+    return queue
+
+
+def job(queue, job_id):
+    """A job's row as a dict"""
+    conn = _connect(queue.db_path)
+    try:
+        return dict(conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone())
+    finally:
+        conn.close()
+
+
+def test_construction_touches_no_files(tmp_path):
+    JobQueue(None, db_path=str(tmp_path / 'jobs' / 'jobs.db'))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_claim_records_dispatcher_pid(tmp_path):
+    queue = make_queue(tmp_path, 2, max_running=1)
+    
+    assert queue._claim() == 'job0'
+    assert job(queue, 'job0')['pid'] == os.getpid()
+    
+    # The dispatcher is alive, the claim keeps its slot
+    assert queue._claim() is None
+    assert job(queue, 'job0')['status'] == 'running'
+
+
+def test_claim_of_dead_dispatcher_is_reaped(tmp_path):
+    queue = make_queue(tmp_path, 2, max_running=1)
+    assert queue._claim() == 'job0'
+    
+    # Dispatcher died before the worker wrote its own pid
+    conn = _connect(queue.db_path)
+    try:
+        conn.execute("UPDATE jobs SET pid = ? WHERE id = 'job0'", (dead_pid(),))
+    finally:
+        conn.close()
+    
+    assert queue._claim() == 'job1'
+    assert job(queue, 'job0')['status'] == 'failed'
+
+
+class CrashingEngine(ChurnEngine):
+    """Engine whose worker process dies (like an OOM kill) on customers marked crash"""
+    
+    def analyze_customers(self, customer_data, activity_data, **kwargs):
+        if 'crash' in customer_data.columns:
+            os._exit(1)
+        return super().analyze_customers(customer_data, activity_data, **kwargs)
+
+
+def test_crashed_worker_doesnt_block_the_queue(tmp_path):
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = CrashingEngine(company_name="Test")
+    queue = JobQueue(engine, db_path=str(tmp_path / 'jobs' / 'jobs.db'), max_running=1, poll_interval=0.05)
+    customers, activities = random_frames(0, n_customers=10, n_activities=50)
+    
+    crashed = queue.submit(customers.assign(crash=1), activities)
+    after = [queue.submit(customers, activities) for _ in range(2)]
+    
+    deadline = time.time() + 240
+    while time.time() < deadline:
+        statuses = [queue.status(job_id)['status'] for job_id in [crashed] + after]
+        if all(status in ('done', 'failed') for status in statuses):
+            break
+        time.sleep(0.1)
+    
+    assert statuses == ['failed', 'done', 'done']
@@ -0,0 +1,48 @@
+"""
+HumanChurnML - Parallel Analysis Tests
+Sharded engagement against the serial path on the same activities
+Run with: python -m pytest tests
+"""
+
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.production.parallel import shard_ids
+from tests.test_engagement import AS_OF, random_frames
+
+
+def analyze(engine, customers, activities, workers):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return engine.analyze_customers(customers, activities, workers=workers, as_of=AS_OF)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_workers_match_serial(engine, seed):
+    customers, activities = random_frames(seed)
+    pd.testing.assert_frame_equal(analyze(engine, customers, activities, 4),
+                                  analyze(engine, customers, activities, 1))
+
+
+def test_day_first_dates_detected_once(engine):
+    customers, activities = random_frames(0, n_customers=40)
+    activities = activities[activities['customer_id'].isin(customers['customer_id'])]
+    activities = activities.dropna(subset=['timestamp']).reset_index(drop=True)
+    
+    # dd/mm/yyyy, only one customer has a day above 12
+    rng = np.random.default_rng(0)
+    days = rng.integers(1, 13, len(activities))
+    late = activities['customer_id'] == activities['customer_id'].iloc[0]
+    days[late.to_numpy()] = 25
+    activities['timestamp'] = [f'{day:02d}/03/2024' for day in days]
+    
+    # Some shard sees nothing but ambiguous days
+    shards = pd.Series(shard_ids(activities['customer_id'], 4))
+    assert shards[~late].nunique() > shards[late].nunique()
+    
+    serial = analyze(engine, customers, activities, 1)
+    assert (serial['recency_days'].dropna() >= 0).all()
+    pd.testing.assert_frame_equal(analyze(engine, customers, activities, 4), serial)
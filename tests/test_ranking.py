@@ -0,0 +1,52 @@
+"""
+HumanChurnML - Top-K Ranking Tests
+top_k and TopK against a full stable sort
+Run with: python -m pytest tests
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.production.ranking import TopK, top_k
+
+
+def scored_frame(seed, n_rows=2000):
+    """Risk capped at 100 (many ties), LTV from few values, some of both missing"""
+    rng = np.random.default_rng(seed)
+    risk = np.minimum(rng.integers(0, 140, n_rows), 100).astype(np.float64)
+    ltv = rng.choice([0.0, 160.0, 250.0, 630.0], n_rows)
+    risk[rng.random(n_rows) < 0.02] = np.nan
+    ltv[rng.random(n_rows) < 0.02] = np.nan
+    return pd.DataFrame({'customer_id': np.arange(n_rows), 'churn_risk': risk, 'predicted_ltv': ltv},
+                        index=rng.permutation(n_rows))
+
+
+def expected_top(df, k, tie_break='predicted_ltv', above=None):
+    rows = df[df['churn_risk'].notna()]
+    if above is not None:
+        rows = rows[rows['churn_risk'] > above]
+    by = ['churn_risk'] if tie_break is None else ['churn_risk', tie_break]
+    return rows.sort_values(by, ascending=False, kind='stable').head(max(k, 0))
+
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('k', [0, 1, 7, 100, 500, 1960, 5000])
+@pytest.mark.parametrize('options', [dict(), dict(tie_break=None), dict(above=70)])
+def test_matches_stable_sort(seed, k, options):
+    df = scored_frame(seed)
+    pd.testing.assert_frame_equal(top_k(df, k, **options), expected_top(df, k, **options))
+
+
+def test_all_tied():
+    df = pd.DataFrame({'churn_risk': 100.0, 'predicted_ltv': np.tile([1.0, 2.0], 500)})
+    pd.testing.assert_frame_equal(top_k(df, 300), expected_top(df, 300))
+
+
+@pytest.mark.parametrize('k', [1, 50, 500])
+def test_running_top_over_chunks(k):
+    df = scored_frame(4)
+    top = TopK(k)
+    for start in range(0, len(df), 173):
+        top.add(df.iloc[start:start + 173])
+    pd.testing.assert_frame_equal(top.result(), expected_top(df, k))
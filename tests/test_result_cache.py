@@ -0,0 +1,78 @@
+"""
+HumanChurnML - Result Cache Tests
+Hits, misses, eviction and keys that must not collide
+Run with: python -m pytest tests
+"""
+
+import contextlib
+import io
+
+import pandas as pd
+
+from src.production.result_cache import ResultCache, frame_digest
+from tests.test_engagement import AS_OF, random_frames
+
+
+def test_hit_and_miss(make_engine):
+    cache = ResultCache()
+    engine = make_engine(cache=cache)
+    customers, activities = random_frames(0)
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        first = engine.analyze_customers(customers, activities, as_of=AS_OF)
+        second = engine.analyze_customers(customers, activities.copy(), as_of=AS_OF)
+        other = engine.analyze_customers(customers, activities.iloc[1:], as_of=AS_OF)
+    
+    pd.testing.assert_frame_equal(second, first)
+    assert second is not first
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 2
+    assert len(other) == len(first)
+
+
+def test_eviction_least_recently_used():
+    cache = ResultCache(max_entries=2)
+    frames = {key: pd.DataFrame({'x': [n]}) for n, key in enumerate('abc')}
+    
+    cache.put('a', frames['a'])
+    cache.put('b', frames['b'])
+    cache.get('a')
+    cache.put('c', frames['c'])
+    
+    assert cache.get('b') is None
+    pd.testing.assert_frame_equal(cache.get('a'), frames['a'])
+    pd.testing.assert_frame_equal(cache.get('c'), frames['c'])
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['entries'] == 2
+
+
+def test_byte_limit_evicts():
+    small = pd.DataFrame({'x': range(10)})
+    size = int(small.memory_usage(index=True, deep=True).sum())
+    cache = ResultCache(max_bytes=size * 2)
+    
+    for key in 'abc':
+        cache.put(key, small)
+    
+    assert cache.stats()['entries'] == 2
+    assert cache.stats()['bytes'] <= size * 2
+
+
+def test_mixed_types_dont_collide(make_engine):
+    # str() of both is the same, the values are not
+    assert frame_digest(pd.DataFrame({'id': [1, '2']})) != frame_digest(pd.DataFrame({'id': ['1', '2']}))
+    assert frame_digest(pd.DataFrame({'id': [1.0, 'a']})) != frame_digest(pd.DataFrame({'id': [1, 'a']}))
+    assert frame_digest(pd.DataFrame({'id': ['1', '2']})) == frame_digest(pd.DataFrame({'id': ['1', '2']}))
+    
+    engine = make_engine(cache=ResultCache())
+    uncached = make_engine(cache=None)
+    activities = pd.DataFrame({'customer_id': ['1', '1', '2'],
+                               'timestamp': ['2024-04-01', '2024-04-02', '2024-04-03']})
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine.analyze_customers(pd.DataFrame({'customer_id': [1, '2']}), activities, as_of=AS_OF)
+        result = engine.analyze_customers(pd.DataFrame({'customer_id': ['1', '2']}), activities, as_of=AS_OF)
+        expected = uncached.analyze_customers(pd.DataFrame({'customer_id': ['1', '2']}), activities, as_of=AS_OF)
+    
+    pd.testing.assert_frame_equal(result, expected)
+    assert list(result['total_activities']) == [2, 1]
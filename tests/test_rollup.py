@@ -0,0 +1,66 @@
+"""
+HumanChurnML - Daily Rollup Tests
+Analysis of rollups against the raw events they were built from
+Run with: python -m pytest tests
+"""
+
+import contextlib
+import io
+
+import pandas as pd
+import pytest
+
+from src.production.rollup import merge_rollups, read_rollup
+from tests.test_engagement import AS_OF, random_frames
+
+
+def day_level(seed, **columns):
+    """random_frames with timestamps cut to the day, as a daily export has them"""
+    customers, activities = random_frames(seed, **columns)
+    activities['timestamp'] = activities['timestamp'].str[:10]
+    return customers, activities
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('columns', [
+    dict(),
+    dict(with_duration=False, with_value=False),
+    dict(n_customers=5, n_activities=12)
+])
+def test_rollup_matches_raw(engine, seed, columns):
+    customers, activities = day_level(seed, **columns)
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        rollup = engine.build_rollup(activities)
+        result = engine.analyze_customers(customers, rollup, as_of=AS_OF)
+        expected = engine.analyze_customers(customers, activities, as_of=AS_OF)
+    
+    assert len(rollup) < len(activities)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_merged_daily_rollups_match_raw(engine, seed):
+    customers, activities = day_level(seed)
+    
+    # One rollup per export, merged into the history
+    with contextlib.redirect_stdout(io.StringIO()):
+        parts = [engine.build_rollup(activities.iloc[start:start + 150])
+                 for start in range(0, len(activities), 150)]
+        result = engine.analyze_customers(customers, merge_rollups(parts), as_of=AS_OF)
+        expected = engine.analyze_customers(customers, activities, as_of=AS_OF)
+    
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_saved_rollup_matches_raw(engine, tmp_path):
+    pytest.importorskip('pyarrow')
+    customers, activities = day_level(0)
+    path = str(tmp_path / 'rollup.parquet')
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine.build_rollup(activities, output_path=path)
+        result = engine.analyze_customers(customers, read_rollup(path), as_of=AS_OF)
+        expected = engine.analyze_customers(customers, activities, as_of=AS_OF)
+    
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
@@ -0,0 +1,76 @@
+"""
+HumanChurnML - Scoring Plan Tests
+Industry tables from the patterns file, overrides and their validation
+Run with: python -m pytest tests
+"""
+
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+from src.production.churn_engine import LEVELS, TRENDS
+from src.production.scoring_plan import DEFAULT_SCORING, compile_plan
+from tests.test_engagement import AS_OF, random_frames
+
+
+def test_unknown_industry_uses_defaults(make_engine):
+    plan = make_engine(industry='unknown')._plan()
+    
+    assert list(plan.level_risk[:-1]) == [DEFAULT_SCORING['level_risk'][level] for level in LEVELS]
+    assert list(plan.level_values[:-1]) == [DEFAULT_SCORING['level_values'][level] for level in LEVELS]
+
+
+def test_ecommerce_tables_come_from_patterns(make_engine):
+    engine = make_engine(industry='ecommerce')
+    patterns = engine.patterns['ecommerce']
+    plan = engine._plan()
+    
+    for code, level in enumerate(LEVELS[1:], start=1):
+        assert plan.level_values[code] == patterns[level]['avg_spend']
+        assert plan.level_risk[code] == pytest.approx(100 * (1 - patterns[level]['repeat_rate']))
+
+
+def test_gaming_tiers_map_onto_levels(make_engine):
+    engine = make_engine(industry='gaming')
+    patterns = engine.patterns['gaming']
+    plan = engine._plan()
+    
+    super_customer = LEVELS.index('Super Customer')
+    assert plan.level_risk[super_customer] == pytest.approx(100 * (1 - patterns['Obsessed']['retention_7day']))
+    assert plan.level_values[super_customer] == pytest.approx(160 * patterns['Obsessed']['value_multiplier'])
+
+
+def test_industry_changes_scores(make_engine):
+    customers, activities = random_frames(2)
+    results = {}
+    for industry in ['unknown', 'ecommerce', 'gaming']:
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[industry] = make_engine(industry=industry).analyze_customers(customers, activities, as_of=AS_OF)
+    
+    assert not np.allclose(results['unknown']['churn_risk'], results['gaming']['churn_risk'])
+    assert not np.allclose(results['unknown']['predicted_ltv'], results['ecommerce']['predicted_ltv'])
+
+
+def test_explicit_scoring_overrides_derived_tables():
+    patterns = {'ecommerce': {
+        'Casual': {'avg_spend': 245.67, 'repeat_rate': 0.35},
+        'scoring': {'level_values': {'Casual': 300}, 'recency_weight': 0.8}
+    }}
+    plan = compile_plan(patterns, 'ecommerce', LEVELS, TRENDS)
+    
+    assert plan.level_values[LEVELS.index('Casual')] == 300
+    assert plan.level_risk[LEVELS.index('Casual')] == pytest.approx(65)
+    assert plan.recency_weight == 0.8
+
+
+@pytest.mark.parametrize('scoring, message', [
+    ({'level_max_activities': {'Regular': 12}}, 'must increase'),
+    ({'level_max_activities': {'Casual': 1}}, 'must increase'),
+    ({'level_risk': {'Loyl': 20}}, 'Unknown levels'),
+    ({'recency_weight': -1}, "can't be negative")
+])
+def test_invalid_overrides_are_rejected(scoring, message):
+    with pytest.raises(ValueError, match=message):
+        compile_plan({'saas': {'scoring': scoring}}, 'saas', LEVELS, TRENDS)
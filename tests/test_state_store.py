@@ -0,0 +1,100 @@
+"""
+HumanChurnML - State Store Tests
+Incremental updates against a full recompute on the whole history
+Run with: python -m pytest tests
+"""
+
+import contextlib
+import io
+import os
+
+import pandas as pd
+import pytest
+
+from src.production.state_store import EngagementStateStore
+from tests.test_engagement import AS_OF, random_frames
+
+
+def split_history(activities, parts):
+    """Consecutive deltas of the history, the way daily exports arrive"""
+    size = -(-len(activities) // parts)
+    return [activities.iloc[start:start + size] for start in range(0, len(activities), size)]
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_incremental_matches_full_recompute(engine, tmp_path, seed):
+    customers, activities = random_frames(seed)
+    path = str(tmp_path / 'state.pkl')
+    first, second = split_history(activities, 2)
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        EngagementStateStore(path, engine).update(first)
+        
+        # The second delta goes into a state reloaded from disk
+        store = EngagementStateStore(path, engine)
+        store.update(second)
+        
+        result = EngagementStateStore(path, engine).score(customers, as_of=AS_OF)
+        expected = engine.analyze_customers(customers, activities, as_of=AS_OF)
+    
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_update_writes_only_new_days(engine, tmp_path):
+    customers, activities = random_frames(0, n_activities=2000)
+    path = str(tmp_path / 'state.pkl')
+    deltas = split_history(activities, 4)
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        store = EngagementStateStore(path, engine)
+        for delta in deltas:
+            store.update(delta)
+        
+        segments = sorted(os.listdir(store.days_dir))
+        assert len(segments) == len(deltas)
+        
+        # Each segment holds one delta's days, never the history so far
+        for segment, delta in zip(segments, deltas):
+            days = pd.read_pickle(os.path.join(store.days_dir, segment))
+            assert len(days) <= len(delta)
+        
+        # Merging the segments keeps the same state
+        store.save()
+        assert len(os.listdir(store.days_dir)) == 1
+        result = EngagementStateStore(path, engine).score(customers, as_of=AS_OF)
+        expected = engine.analyze_customers(customers, activities, as_of=AS_OF)
+    
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_update_reads_no_day_segments(engine, tmp_path, monkeypatch):
+    customers, activities = random_frames(1, n_activities=2000)
+    path = str(tmp_path / 'state.pkl')
+    deltas = split_history(activities, 4)
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        EngagementStateStore(path, engine).update(deltas[0])
+    
+    read = []
+    read_pickle = pd.read_pickle
+    
+    def recording_read_pickle(filepath, *args, **kwargs):
+        read.append(str(filepath))
+        return read_pickle(filepath, *args, **kwargs)
+    
+    monkeypatch.setattr(pd, 'read_pickle', recording_read_pickle)
+    
+    # Daily runs load only the per-customer state
+    with contextlib.redirect_stdout(io.StringIO()):
+        for delta in deltas[1:]:
+            store = EngagementStateStore(path, engine)
+            store.update(delta)
+    assert read == [path] * 3
+    
+    # Scoring reads every segment once
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = EngagementStateStore(path, engine).score(customers, as_of=AS_OF)
+        expected = engine.analyze_customers(customers, activities, as_of=AS_OF)
+    assert len([p for p in read if p.startswith(f"{path}.days")]) == len(deltas)
+    
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)